@@ -0,0 +1,211 @@
+"""XML: DEFAULT parser batch
+
+Parses many files with the style in a pool of worker processes. Each
+worker creates its parser and loads the node parsers once, so the
+cost of starting lexor is paid once per worker instead of once per
+file. The files may be given as paths, directories, which are
+searched recursively for the files matching `--pattern`, glob
+patterns or, with `--files-from`, a file listing one path per line
+(`-` for the standard input):
+
+    python batch.py docs/ 'extra/*.xml' --processes 8 --json report.json
+    find . -name '*.xml' | python batch.py --files-from -
+
+A line of JSON is written for each file as soon as it is parsed,
+with the time the parse took and the number of messages of each
+code, or the error which stopped the file from being read or parsed.
+The files are parsed in any order. Once all of them are done a
+summary is written with the totals and a histogram of the codes,
+keyed by `module:code` since codes are only unique within a module.
+With `--json` the summary and the results of every file are saved to
+a file.
+
+As with `benchmark.py`, the style needs to be available to lexor.
+
+"""
+from __future__ import print_function
+
+import os
+import sys
+import glob
+import json
+import codecs
+import time
+import fnmatch
+import argparse
+import multiprocessing
+from lexor.core.parser import Parser
+
+# Parser used by a worker process and the encoding of the files.
+PARSER = None
+ENCODING = 'utf-8'
+
+
+def collect(paths, pattern='*.xml', files_from=None):
+    """Return the list of files given by `paths` and the file
+    `files_from`. """
+    if files_from is not None:
+        if files_from == '-':
+            lines = sys.stdin.readlines()
+        else:
+            with open(files_from) as tmpf:
+                lines = tmpf.readlines()
+        paths = list(paths) + [line.strip() for line in lines]
+    files = []
+    for path in paths:
+        if not path:
+            continue
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                files.extend([
+                    os.path.join(root, name)
+                    for name in sorted(fnmatch.filter(names, pattern))
+                ])
+        elif os.path.exists(path) or not glob.has_magic(path):
+            files.append(path)
+        else:
+            files.extend(sorted(glob.glob(path)))
+    return files
+
+
+def init_worker(defaults, encoding):
+    """Create the parser of a worker process. """
+    global PARSER, ENCODING  # pylint: disable=global-statement
+    PARSER = Parser('xml', 'default', defaults)
+    PARSER.load_node_parsers()
+    ENCODING = encoding
+
+
+def read_file(path):
+    """Return the text of the file `path`. lexor works with byte
+    strings on Python 2, so there the text is kept in bytes and only
+    converted to UTF-8 if the files use another encoding. """
+    with open(path, 'rb') as tmpf:
+        text = tmpf.read()
+    if str is not bytes:
+        return text.decode(ENCODING)
+    if codecs.lookup(ENCODING).name != 'utf-8':
+        text = text.decode(ENCODING).encode('utf-8')
+    return text
+
+
+def module_name(module):
+    """Return the short name of the `module` which sent a message:
+    the name of the auxiliary module of the style or the last part of
+    the name of a lexor module. """
+    prefix = PARSER.style_module.__name__ + '_'
+    if module.startswith(prefix):
+        return module[len(prefix):]
+    return module.rsplit('.', 1)[-1]
+
+
+def parse_file(path):
+    """Parse the file `path` in a worker process. Returns a dictionary
+    with the results. If the file cannot be read or parsed the result
+    has an `error` instead. """
+    result = {'path': path}
+    try:
+        text = read_file(path)
+    except (IOError, OSError, UnicodeError) as err:
+        result['error'] = str(err)
+        return result
+    start = time.time()
+    try:
+        PARSER.parse(text, path)
+    except Exception as err:  # pylint: disable=broad-except
+        result['error'] = '%s: %s' % (err.__class__.__name__, err)
+        return result
+    result['time'] = time.time() - start
+    result['size'] = len(text)
+    codes = dict()
+    for msg in PARSER.log.child:
+        key = '%s:%s' % (module_name(msg['module']), msg['code'])
+        codes[key] = codes.get(key, 0) + 1
+    result['codes'] = codes
+    result['messages'] = sum(codes.values())
+    return result
+
+
+def run(files, defaults, processes=None, encoding='utf-8'):
+    """Generate the results of parsing the `files` as they are done.
+    With a single process the files are parsed in this process. """
+    if processes == 1:
+        init_worker(defaults, encoding)
+        for path in files:
+            yield parse_file(path)
+        return
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    chunksize = max(1, min(64, len(files) // (processes * 8)))
+    pool = multiprocessing.Pool(processes, init_worker,
+                                (defaults, encoding))
+    try:
+        for result in pool.imap_unordered(parse_file, files, chunksize):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
+
+
+def summarize(results, wall):
+    """Return the totals of the `results`. """
+    codes = dict()
+    for result in results:
+        for key, num in result.get('codes', {}).items():
+            codes[key] = codes.get(key, 0) + num
+    return {
+        'files': len(results),
+        'failed': len([item for item in results if 'error' in item]),
+        'messages': sum(codes.values()),
+        'codes': codes,
+        'parse_time': sum([item.get('time', 0) for item in results]),
+        'wall_time': wall,
+    }
+
+
+def main(argv):
+    """Parse the files given in `argv`. """
+    desc = 'Parse many files with the xml default parser style.'
+    argp = argparse.ArgumentParser(description=desc)
+    argp.add_argument('paths', nargs='*',
+                      help='files, directories or glob patterns')
+    argp.add_argument('--files-from', metavar='FILE',
+                      help='read more paths from this file, - for stdin')
+    argp.add_argument('--pattern', default='*.xml',
+                      help='files to parse in the directories')
+    argp.add_argument('--processes', type=int, default=None,
+                      help='number of worker processes')
+    argp.add_argument('--encoding', default='utf-8',
+                      help='encoding of the files')
+    argp.add_argument('--option', action='append', default=[],
+                      metavar='NAME=VALUE', help='option of the style')
+    argp.add_argument('--quiet', action='store_true',
+                      help='only write the summary')
+    argp.add_argument('--json', help='save the results to this file')
+    arg = argp.parse_args(argv)
+    defaults = dict([item.split('=', 1) for item in arg.option])
+    files = collect(arg.paths, arg.pattern, arg.files_from)
+    results = []
+    start = time.time()
+    for result in run(files, defaults, arg.processes, arg.encoding):
+        results.append(result)
+        if not arg.quiet:
+            print(json.dumps(result, sort_keys=True))
+            sys.stdout.flush()
+    summary = summarize(results, time.time() - start)
+    print(json.dumps(summary, sort_keys=True))
+    if arg.json:
+        with open(arg.json, 'w') as tmpf:
+            json.dump({
+                'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'python': sys.version.split()[0],
+                'options': defaults,
+                'summary': summary,
+                'results': sorted(results, key=lambda item: item['path']),
+            }, tmpf, indent=2, sort_keys=True)
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,158 @@
+"""XML: DEFAULT parser benchmark
+
+Counts the number of times the `make_node` method of each node parser
+gets called while parsing a document and how many of those calls
+were declined (the method returned `None`). The document is parsed
+twice: once trying the node parsers in order, the way the style used
+to do it, and once with the `DispatchNP` node parser.
+
+The style needs to be available to lexor, i.e. run `lexor develop`
+in this directory first. Usage:
+
+    python benchmark.py [file.xml ...]
+    python benchmark.py --adversarial
+
+If no file is given then a synthetic document is used. The second
+form times the parse of inputs which used to take quadratic time,
+such as many `<` with no `>`, at sizes `n`, `2n` and `4n`. The time
+should roughly double with each size.
+
+"""
+from __future__ import print_function
+
+import sys
+import time
+from lexor.core.parser import Parser
+
+ORDERED = [
+    'ElementNP',
+    'CDataNP',
+    'DocumentTypeNP',
+    'CommentNP',
+    'ProcessingInstructionNP',
+    'EntityNP',
+]
+
+
+def synthetic(num=2000):
+    """Return an element heavy document with a few of each of the
+    other kinds of nodes. """
+    item = (
+        '  <item id="%d" type="a">\n'
+        '    <name>item &amp; co &#60;%d&#62;</name>\n'
+        '    <!-- comment %d -->\n'
+        '    <?pi target %d?>\n'
+        '    <![CDATA[raw <data> %d]]>\n'
+        '    <empty/>\n'
+        '  </item>\n'
+    )
+    body = ''.join([item % ((i,)*5) for i in range(num)])
+    return '<!DOCTYPE items>\n<items>\n%s</items>\n' % body
+
+
+ADVERSARIAL = [
+    ('open tags without `>`', '<a '),
+    ('closing tags without `>`', '</ '),
+    ('long opening tag', None),
+]
+
+
+def adversarial(unit, num):
+    """Return `num` copies of `unit`. If `unit` is `None` then return
+    an element whose opening tag has `num` attributes. """
+    if unit is None:
+        atts = ''.join([' a%d="%d"' % (i, i) for i in range(num)])
+        return '<a%s>text<b/></a>' % atts
+    return unit * num
+
+
+def _count(counter, name, method):
+    """Wrap the `make_node` method of a node parser. """
+    def make_node():
+        """Counting `make_node`. """
+        node = method()
+        counter[name][0] += 1
+        if node is None:
+            counter[name][1] += 1
+        return node
+    return make_node
+
+
+def count_nodes(node):
+    """Return the number of nodes in the tree. """
+    total = 0
+    stack = [node]
+    while stack:
+        crt = stack.pop()
+        total += 1
+        if crt.child:
+            stack.extend(crt.child)
+    return total - 1
+
+
+def run(text, ordered):
+    """Parse `text` and return the counts for each node parser. """
+    parser = Parser('xml', 'default')
+    parser.load_node_parsers()
+    if ordered:
+        parser._np['__default__'] = [parser[name] for name in ORDERED]
+    counter = dict()
+    for name in ORDERED:
+        counter[name] = [0, 0]
+        nparser = parser[name]
+        nparser.make_node = _count(counter, name, nparser.make_node)
+    start = time.time()
+    parser.parse(text)
+    elapsed = time.time() - start
+    return counter, count_nodes(parser.doc), elapsed
+
+
+def report(label, counter, nodes, elapsed):
+    """Display the counts obtained from `run`. """
+    print('%s: %d nodes in %.3fs' % (label, nodes, elapsed))
+    print('    %-24s %10s %10s' % ('node parser', 'calls', 'declined'))
+    calls = declined = 0
+    for name in ORDERED:
+        calls += counter[name][0]
+        declined += counter[name][1]
+        print('    %-24s %10d %10d' % (name, counter[name][0],
+                                      counter[name][1]))
+    print('    %-24s %10d %10d' % ('total', calls, declined))
+    print('    declined calls per node: %.3f' % (
+        float(declined) / max(nodes, 1)))
+
+
+def scaling(num=20000):
+    """Display the time it takes to parse each of the adversarial
+    inputs at sizes `num`, `2*num` and `4*num`. """
+    parser = Parser('xml', 'default')
+    for label, unit in ADVERSARIAL:
+        print('== %s' % label)
+        times = []
+        for size in [num, 2*num, 4*num]:
+            text = adversarial(unit, size)
+            start = time.time()
+            parser.parse(text)
+            times.append(time.time() - start)
+            print('    n = %-8d %8d bytes %8.3fs' % (
+                size, len(text), times[-1]))
+        print('    ratio 4n/n: %.2f' % (times[2] / max(times[0], 1e-6)))
+
+
+def main(argv):
+    """Run the benchmark. """
+    if argv == ['--adversarial']:
+        scaling()
+        return
+    if argv:
+        texts = [(path, open(path).read()) for path in argv]
+    else:
+        texts = [('synthetic', synthetic())]
+    for name, text in texts:
+        print('== %s (%d bytes)' % (name, len(text)))
+        report('ordered', *run(text, True))
+        report('dispatch', *run(text, False))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
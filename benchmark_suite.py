@@ -0,0 +1,310 @@
+"""XML: DEFAULT parser benchmark suite
+
+Parses a set of synthetic documents, each one stressing a different
+part of the style, and reports for each of them the throughput in MB/s
+and nodes/s, the peak memory used by the parse and, for each node
+parser, the number of calls to `make_node`, how many were declined,
+the time spent in them, the number of characters they consumed and
+the messages they sent. These are obtained with the `profile` option
+of the style.
+
+The results may be saved as JSON and compared with the results of an
+earlier run to find regressions:
+
+    python benchmark_suite.py --json before.json
+    ... change the style ...
+    python benchmark_suite.py --json after.json
+    python benchmark_suite.py --compare before.json after.json
+
+The suite also times, in new processes, the import of lexor, the
+loading of the style and the first parse of a small document, which
+is what a short lived process pays before doing any work.
+
+The peak memory is the growth of the peak resident set size of a new
+process while it parses the document. It is read from `/proc` where
+possible since on Linux a new process inherits the peak given by the
+`resource` module from its parent. Where `resource` is not available
+it is reported as `null`.
+As with `benchmark.py`, the style needs to be available to lexor.
+
+"""
+from __future__ import print_function
+
+import sys
+import json
+import time
+import argparse
+import subprocess
+from lexor.core.parser import Parser
+from lexor.command.lang import get_style_module
+from lexor.command.test import parse_msg
+from benchmark import ORDERED, count_nodes
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def deep(num):
+    """Elements nested `num` levels deep. """
+    return '%sx%s' % ('<d>' * num, '</d>' * num)
+
+
+def wide(num):
+    """A root element with `num` empty children. """
+    return '<r>\n%s</r>\n' % ''.join(
+        ['  <c i="%d"/>\n' % i for i in range(num)]
+    )
+
+
+def attributes(num, size=20):
+    """`num` elements with `size` attributes each. """
+    atts = ''.join([' att%d="value %d"' % (i, i) for i in range(size)])
+    return '<r>\n%s</r>\n' % (('  <c%s/>\n' % atts) * num)
+
+
+def blocks(num, size=4096):
+    """`num` CDATA sections and comments of `size` characters. """
+    data = ('x' * 63 + '\n') * (size // 64)
+    item = '<![CDATA[%s]]>\n<!--%s-->\n' % (data, data)
+    return '<r>\n%s</r>\n' % (item * num)
+
+
+def entities(num):
+    """Text with many entities. """
+    line = 'a &amp; b &lt; c &#60; d &#x3e; e &gt;\n'
+    return '<r>\n%s</r>\n' % (line * num)
+
+
+GENERATORS = [
+    ('deep', deep, 1000),
+    ('wide', wide, 20000),
+    ('attributes', attributes, 2000),
+    ('blocks', blocks, 200),
+    ('entities', entities, 20000),
+]
+
+
+def malformed(num):
+    """Return a list of `(name, text)` with one document for each of
+    the codes in the `MSG_EXPLANATION` of the node parsers. Each
+    document repeats the first example of a code `num` times. """
+    mod = get_style_module('parser', 'xml', 'default')
+    docs = []
+    for name in sorted(mod.MOD):
+        explanation = getattr(mod.MOD[name], 'MSG_EXPLANATION', [])
+        seen = set()
+        for msg in explanation:
+            for code, text in parse_msg(msg)[1]:
+                if code == 'Okay' or code in seen:
+                    continue
+                seen.add(code)
+                docs.append(('malformed-%s-%s' % (name, code),
+                             '\n'.join([text] * num)))
+    return docs
+
+
+def documents(scale=1.0):
+    """Return a list of `(name, text)` with all the documents of the
+    suite. The sizes are multiplied by `scale`. """
+    docs = []
+    for name, func, num in GENERATORS:
+        docs.append((name, func(max(int(num * scale), 1))))
+    docs.extend(malformed(max(int(500 * scale), 1)))
+    return docs
+
+
+# Script run by `startup` in a new process.
+STARTUP = """
+import json, time
+start = time.time()
+from lexor.core.parser import Parser
+lexor = time.time()
+parser = Parser('xml', 'default')
+parser.load_node_parsers()
+style = time.time()
+parser.parse('<r a="1"><c/>text &amp; more</r>')
+parse = time.time()
+print(json.dumps([lexor - start, style - lexor, parse - style]))
+"""
+
+
+def startup(repeat=3):
+    """Return the best times, in new processes, to import lexor, to
+    load the style and to parse a small document. """
+    best = None
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, '-c', STARTUP])
+        times = json.loads(output.decode('utf-8').splitlines()[-1])
+        if best is None:
+            best = times
+        best = [min(old, new) for old, new in zip(best, times)]
+    return dict(zip(['lexor', 'style', 'first_parse'], best))
+
+
+def node_parsers(text):
+    """Parse `text` with the `profile` option and return the report
+    of the profiler. """
+    parser = Parser('xml', 'default', {'profile': 'true'})
+    parser.parse(text)
+    return parser.profile.report()
+
+
+# Script run by `peak_memory` in a new process.
+PEAK = """
+import sys, json, resource
+from lexor.core.parser import Parser
+def peak():
+    try:
+        with open('/proc/self/status') as tmpf:
+            for line in tmpf:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except IOError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+text = sys.stdin.read()
+parser = Parser('xml', 'default')
+parser.load_node_parsers()
+before = peak()
+parser.parse(text)
+print(json.dumps(peak() - before))
+"""
+
+
+def peak_memory(text):
+    """Return the number of bytes the peak memory of a new process
+    grows by while parsing `text` or `None` if `resource` is not
+    available. """
+    if resource is None:
+        return None
+    if not isinstance(text, bytes):
+        text = text.encode('utf-8')
+    proc = subprocess.Popen([sys.executable, '-c', PEAK],
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    output = proc.communicate(text)[0]
+    if proc.returncode != 0:
+        return None
+    peak = json.loads(output.decode('utf-8').splitlines()[-1])
+    # The size is given in kilobytes, except on macOS.
+    if sys.platform != 'darwin':
+        peak *= 1024
+    return peak
+
+
+def measure(name, text, repeat=3):
+    """Return a dictionary with the results of parsing `text`. The
+    time is the best of `repeat` parses. """
+    parser = Parser('xml', 'default')
+    parser.load_node_parsers()
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        parser.parse(text)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    best = max(best, 1e-9)
+    nodes = count_nodes(parser.doc)
+    return {
+        'name': name,
+        'bytes': len(text),
+        'nodes': nodes,
+        'messages': len(parser.log.child),
+        'seconds': best,
+        'mb_per_s': len(text) / best / 1e6,
+        'nodes_per_s': nodes / best,
+        'peak_bytes': peak_memory(text),
+        'node_parsers': node_parsers(text),
+    }
+
+
+def report(result):
+    """Display a result of `measure`. """
+    peak = result['peak_bytes']
+    print('== %s: %d bytes, %d nodes, %d messages' % (
+        result['name'], result['bytes'], result['nodes'],
+        result['messages']))
+    print('    %.4fs  %.2f MB/s  %.0f nodes/s  peak %s' % (
+        result['seconds'], result['mb_per_s'], result['nodes_per_s'],
+        'n/a' if peak is None else '%.2f MB' % (peak / 1e6)))
+    print('    %-24s %9s %9s %9s %10s  %s' % (
+        'node parser', 'calls', 'declined', 'seconds', 'bytes',
+        'messages'))
+    for name in ORDERED:
+        stats = result['node_parsers'][name]
+        if stats['calls']:
+            print('    %-24s %9d %9d %9.4f %10d  %s' % (
+                name, stats['calls'], stats['declined'],
+                stats['seconds'], stats['bytes'],
+                ' '.join(['%s:%d' % item for item in
+                          sorted(stats['messages'].items())])))
+
+
+def compare(old, new):
+    """Display the change in throughput for the documents found in
+    the results `old` and `new`, and the change in startup time. """
+    if 'startup' in old and 'startup' in new:
+        print('%-36s %10s %10s %8s' % ('startup', 'old ms', 'new ms',
+                                       'ratio'))
+        for key in ['lexor', 'style', 'first_parse']:
+            prev = old['startup'][key]
+            print('%-36s %10.2f %10.2f %8.2f' % (
+                key, prev * 1e3, new['startup'][key] * 1e3,
+                new['startup'][key] / max(prev, 1e-9)))
+    before = dict([(item['name'], item) for item in old['results']])
+    print('%-36s %10s %10s %8s' % ('document', 'old MB/s', 'new MB/s',
+                                   'ratio'))
+    for item in new['results']:
+        if item['name'] not in before:
+            continue
+        prev = before[item['name']]['mb_per_s']
+        print('%-36s %10.2f %10.2f %8.2f' % (
+            item['name'], prev, item['mb_per_s'],
+            item['mb_per_s'] / max(prev, 1e-9)))
+
+
+def main(argv):
+    """Run the benchmark suite. """
+    desc = 'Benchmark suite for the xml default parser style.'
+    argp = argparse.ArgumentParser(description=desc)
+    argp.add_argument('--scale', type=float, default=1.0,
+                      help='multiply the size of the documents')
+    argp.add_argument('--repeat', type=int, default=3,
+                      help='number of timed parses of each document')
+    argp.add_argument('--only', default='',
+                      help='run the documents whose name starts with it')
+    argp.add_argument('--json', help='save the results to this file')
+    argp.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                      help='compare two files saved with --json')
+    arg = argp.parse_args(argv)
+    if arg.compare:
+        with open(arg.compare[0]) as tmpf:
+            old = json.load(tmpf)
+        with open(arg.compare[1]) as tmpf:
+            new = json.load(tmpf)
+        compare(old, new)
+        return
+    times = startup(arg.repeat)
+    print('== startup: lexor %.2f ms, style %.2f ms, first parse %.2f ms'
+          % (times['lexor'] * 1e3, times['style'] * 1e3,
+             times['first_parse'] * 1e3))
+    results = []
+    for name, text in documents(arg.scale):
+        if not name.startswith(arg.only):
+            continue
+        results.append(measure(name, text, arg.repeat))
+        report(results[-1])
+    if arg.json:
+        with open(arg.json, 'w') as tmpf:
+            json.dump({
+                'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'python': sys.version.split()[0],
+                'scale': arg.scale,
+                'startup': times,
+                'results': results,
+            }, tmpf, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
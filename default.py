@@ -4,9 +4,22 @@ This style attempts to follow all the XML rules and gathers all the
 information in an xml file. This includes all the extra spaces, new
 lines and tab characters the file might contain.
 
+The auxiliary modules of the style are loaded the first time they are
+requested from `MOD`, so loading the style only imports the modules
+of the node parsers and the helpers used by every parse.
+
 """
 
-from lexor import init, load_aux
+import sys
+from glob import glob
+from imp import load_source
+from os.path import splitext, abspath, basename
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+from lexor import init
+from lexor.core import elements
 
 
 INFO = init(
@@ -20,15 +33,160 @@ INFO = init(
     license='BSD License',
     path=__file__
 )
-MOD = load_aux(INFO)
+DEFAULTS = {
+    'coalesce_text': 'false',
+    'decode_entities': 'false',
+    'defer_positions': 'false',
+    'diagnostics': 'true',
+    'max_depth': '0',
+    'max_elements': '0',
+    'numpy_scan': 'false',
+    'profile': 'false',
+    'share_names': 'false',
+    'strip_whitespace': 'false',
+}
+
+
+class AuxModules(Mapping):
+    """The auxiliary modules of a style, keyed by name like the
+    dictionary returned by `load_aux`. A module is loaded when it is
+    first requested. """
+
+    def __init__(self, info):
+        self.dirpath = splitext(abspath(info['path']))[0]
+        self.modbase = 'lexor-lang_%s_%s_%s' % (
+            info['lang'], info['type'], info['style']
+        )
+        self.names = sorted([
+            basename(path)[:-3] for path in glob('%s/*.py' % self.dirpath)
+            if 'test' not in basename(path)
+        ])
+        self.modules = dict()
+
+    def __getitem__(self, name):
+        try:
+            return self.modules[name]
+        except KeyError:
+            if name not in self.names:
+                raise
+        modname = '%s_%s' % (self.modbase, name)
+        module = sys.modules.get(modname)
+        if module is None:
+            module = load_source(modname, '%s/%s.py' % (self.dirpath, name))
+        self.modules[name] = module
+        return module
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+
+MOD = AuxModules(INFO)
+# Tag and attribute names shared by the parsers with `share_names`.
+NAMES = dict()
+REPOSITORY = [
+    MOD['element'].ElementNP,
+    MOD['cdata'].CDataNP,
+    MOD['doctype'].DocumentTypeNP,
+    MOD['comment'].CommentNP,
+    MOD['pi'].ProcessingInstructionNP,
+    MOD['entity'].EntityNP,
+]
 MAPPING = {
     '__default__': (
         '<&', [
-            MOD['element'].ElementNP,
-            MOD['cdata'].CDataNP,
-            MOD['doctype'].DocumentTypeNP,
-            MOD['comment'].CommentNP,
-            MOD['pi'].ProcessingInstructionNP,
-            MOD['entity'].EntityNP,
+            MOD['dispatch'].DispatchNP,
         ]),
 }
+
+
+def option(parser, name):
+    """Return the value of the boolean option `name`. The options
+    may be given as strings such as `'true'` and `'off'`. """
+    value = parser.defaults.get(name, DEFAULTS[name])
+    return str(value).lower() in ['true', 'on', 'yes', '1']
+
+
+def number(parser, name):
+    """Return the value of the integer option `name`. """
+    return int(parser.defaults.get(name, DEFAULTS[name]))
+
+
+def pre_process(parser):
+    """Attach the objects the node parsers share during a parse. The
+    node parsers create nodes with the classes in `parser.nodes`,
+    which defaults to `lexor.core.elements`. Tag and attribute names
+    are interned in `parser.names`, a table which lasts for the parse
+    or, with the `share_names` option, for the life of the process.
+    If the parser has an `origin_` position then the text is taken to
+    be a piece of a document starting at that position. With the
+    `profile` option the node parsers are measured by `parser.profile`.
+    With the `diagnostics` option off no message is sent, not even
+    the ones sent by the parser when it closes elements. The options
+    `decode_entities` and `strip_whitespace` are read into attributes
+    of the same name. The elements in progress are kept by
+    `parser.open_elements`, which enforces the `max_depth` and
+    `max_elements` options. The changes left by a parse that raised
+    are undone first. """
+    restore(parser)
+    if not hasattr(parser, 'nodes'):
+        parser.nodes = elements
+    if option(parser, 'share_names'):
+        parser.names = NAMES
+    else:
+        parser.names = dict()
+    origin = getattr(parser, 'origin_', None)
+    if origin is None:
+        origin = (1, 1)
+    parser.pos = list(origin)
+    parser.decode_entities = option(parser, 'decode_entities')
+    parser.strip_whitespace = option(parser, 'strip_whitespace')
+    if option(parser, 'numpy_scan') and MOD['scan'].load_numpy():
+        parser.delimiters = MOD['scan'].ArrayDelimiters(parser)
+    else:
+        parser.delimiters = MOD['scan'].Delimiters(parser)
+    quiet = not option(parser, 'diagnostics')
+    parser.line_index = MOD['position'].LineIndex(
+        parser, option(parser, 'defer_positions'), origin, quiet
+    )
+    if quiet:
+        parser.msg = MOD['position'].ignore
+    elif parser.line_index.deferred:
+        parser.msg = parser.line_index.send
+    parser.open_elements = MOD['element'].OpenElements(
+        parser, number(parser, 'max_depth'), number(parser, 'max_elements')
+    )
+    # pylint: disable=protected-access
+    parser._close_node = parser.open_elements.close_node
+    parser.profile = None
+    if option(parser, 'profile'):
+        parser.profile = MOD['profiler'].Profiler(parser)
+        parser.profile.start()
+
+
+def restore(parser):
+    """Undo the changes `pre_process` makes to the methods of `parser`
+    and of its node parsers. Nothing is done if they were already
+    undone. """
+    parser.__dict__.pop('msg', None)
+    parser.__dict__.pop('_close_node', None)
+    if getattr(parser, 'profile', None) is not None:
+        parser.profile.restore()
+
+
+def post_process(parser):
+    """Send the messages that were deferred during the parse, stop
+    the profiler and, with the `coalesce_text` or `strip_whitespace`
+    options, join the text nodes of the document. """
+    restore(parser)
+    parser.line_index.flush()
+    if parser.doc is not None and (
+            parser.strip_whitespace or option(parser, 'coalesce_text')):
+        MOD['coalesce'].coalesce(parser.doc, parser.strip_whitespace)
+    if parser.profile is not None:
+        parser.profile.stop()
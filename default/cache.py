@@ -0,0 +1,149 @@
+"""XML: CACHE helper
+
+Documents which are parsed over and over again, such as configuration
+files, may be parsed through a `ParseCache`. The results are kept in
+memory keyed by a hash of the text and the options of the parser, so
+parsing the same text a second time only rebuilds the document from
+a flat list of records:
+
+    cache = ParseCache(maxsize=256, directory='/tmp/xml-cache')
+    cache.parse(parser, text, 'config.xml')
+    parser.doc, parser.log
+
+The least recently used results are dropped once there are more than
+`maxsize` of them or once they add up to more than `maxbytes` bytes,
+the size of a result being the size of its pickle. With a `directory`
+the results are also saved to disk, so that they outlive the process.
+The `stats` method returns the number of hits, misses and evictions.
+
+Each call builds a new document, which may be modified without
+affecting the cache.
+
+"""
+
+import os
+import pickle
+import hashlib
+from collections import OrderedDict
+from lexor.command.lang import map_explanations
+
+
+def text_key(parser, text):
+    """Return a key for the parse of `text` by `parser`. It depends
+    on the text, the style, the options and the origin of the
+    parser. """
+    if parser.style_module is None:
+        parser.load_node_parsers()
+    digest = hashlib.sha1()
+    if not isinstance(text, bytes) and hasattr(text, 'encode'):
+        text = text.encode('utf-8')
+    digest.update(text)
+    options = repr((
+        parser.style_module.__name__,
+        sorted(parser.defaults.items()),
+        getattr(parser, 'origin_', None),
+    ))
+    digest.update(options.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ParseCache(object):
+    """Least recently used cache of parsed documents. """
+
+    def __init__(self, maxsize=128, maxbytes=None, directory=None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if directory is not None and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def stats(self):
+        """Return a dictionary with the counters of the cache. """
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self.entries),
+            'bytes': self.size,
+        }
+
+    def clear(self):
+        """Remove all the results kept in memory. """
+        self.entries.clear()
+        self.size = 0
+
+    def _path(self, key):
+        """Return the path of the file for `key`. """
+        return os.path.join(self.directory, '%s.pickle' % key)
+
+    def _get(self, key):
+        """Return the entry for `key` or `None`. """
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.entries[key] = entry
+            self.hits += 1
+            return entry
+        if self.directory is None or not os.path.exists(self._path(key)):
+            return None
+        try:
+            with open(self._path(key), 'rb') as tmpf:
+                data = tmpf.read()
+            entry = (len(data),) + pickle.loads(data)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return None
+        self.disk_hits += 1
+        self._put(key, entry)
+        return entry
+
+    def _put(self, key, entry):
+        """Keep `entry`, a tuple `(size, records, messages)`, dropping
+        the least recently used entries if needed. """
+        self.entries[key] = entry
+        self.size += entry[0]
+        while self.entries and (
+                len(self.entries) > self.maxsize or
+                (self.maxbytes is not None and self.size > self.maxbytes)):
+            _, old = self.entries.popitem(last=False)
+            self.size -= old[0]
+            self.evictions += 1
+
+    def _save(self, key, data):
+        """Write `data`, the pickle of an entry, to the directory of
+        the cache. """
+        path = self._path(key)
+        tmp_path = '%s.%d' % (path, os.getpid())
+        with open(tmp_path, 'wb') as tmpf:
+            tmpf.write(data)
+        os.rename(tmp_path, path)
+
+    def parse(self, parser, text, uri=None):
+        """Parse `text` with `parser` unless the result is in the
+        cache. In both cases `parser.doc` and `parser.log` hold the
+        document and the messages. """
+        key = text_key(parser, text)
+        parallel = parser.style_module.MOD['parallel']
+        entry = self._get(key)
+        if entry is None:
+            self.misses += 1
+            parser.parse(text, uri)
+            result = (parallel.dump(parser.doc), [
+                (msg['module'], msg['code'], msg['position'], msg['arg'])
+                for msg in parser.log.child
+            ])
+            data = pickle.dumps(result, 2)
+            self._put(key, (len(data),) + result)
+            if self.directory is not None:
+                self._save(key, data)
+            return
+        parser.parse('', uri)
+        parallel.load(parser.doc, entry[1])
+        for mod_name, code, pos, arg in entry[2]:
+            parser.msg(mod_name, code, pos, arg, uri)
+        map_explanations(parser.log.modules, parser.log.explanation)
@@ -19,7 +19,6 @@ is
 """
 
 from lexor.core.parser import NodeParser
-from lexor.core.elements import CData
 
 
 class CDataNP(NodeParser):
@@ -31,13 +30,13 @@ class CDataNP(NodeParser):
         caret = parser.caret
         if parser.text[caret:caret+9] != '<![CDATA[':
             return None
-        index = parser.text.find(']]>', caret+9)
+        index = parser.delimiters.find(']]>', caret+9)
         if index == -1:
-            self.msg('E100', parser.pos)
+            parser.line_index.msg(self, 'E100', caret)
             parser.update(parser.end)
-            return CData(parser.text[caret+9:parser.end])
+            return parser.nodes.CData(parser.text[caret+9:parser.end])
         parser.update(index+3)
-        return CData(parser.text[caret+9:index])
+        return parser.nodes.CData(parser.text[caret+9:index])
 
 
 MSG = {
@@ -0,0 +1,72 @@
+"""XML: COALESCE helper
+
+The parser joins the text it reads with the text node before it, but
+text is still split by entities and whitespace between elements is
+kept as text nodes. With the `coalesce_text` option the style goes
+over the document once it is parsed, joins adjacent text nodes and
+removes the empty ones. With the `strip_whitespace` option the text
+nodes made only of whitespace are removed as well.
+
+Unlike `Node.normalize`, each list of children is rebuilt once, so
+the work done is proportional to the number of nodes.
+
+"""
+
+from lexor.core import elements
+
+
+def _coalesce_children(node, strip):
+    """Join the text children of `node`. Returns the number of nodes
+    removed. """
+    kept = []
+    run = []
+    for child in node.child:
+        if isinstance(child, elements.Text):
+            run.append(child)
+            continue
+        if run:
+            _flush(run, kept, strip)
+            run = []
+        kept.append(child)
+    if run:
+        _flush(run, kept, strip)
+    removed = len(node.child) - len(kept)
+    if removed:
+        node.child[:] = kept
+        prev = None
+        for index, child in enumerate(kept):
+            child.index = index
+            child.prev = prev
+            child.next = None
+            if prev is not None:
+                prev.next = child
+            prev = child
+    return removed
+
+
+def _flush(run, kept, strip):
+    """Join the adjacent text nodes in `run` into the first one and
+    add it to `kept` unless it is empty. """
+    text = run[0]
+    if len(run) > 1:
+        text.data = ''.join([item.data for item in run])
+        for item in run[1:]:
+            item.disconnect()
+    if text.data == '' or (strip and text.data.isspace()):
+        text.disconnect()
+    else:
+        kept.append(text)
+
+
+def coalesce(node, strip=False):
+    """Join the adjacent text nodes and remove the empty ones in the
+    tree of `node`. If `strip` is true then the text nodes containing
+    only whitespace are removed too. Returns the number of nodes
+    removed. """
+    removed = 0
+    stack = [node]
+    while stack:
+        crt = stack.pop()
+        removed += _coalesce_children(crt, strip)
+        stack.extend([child for child in crt.child if child.child])
+    return removed
@@ -3,6 +3,8 @@
 An XML comment is enclosed within `<!--` and `-->`. The string `--`
 (double-hyphen) MUST NOT occur within comments. If the string starts
 with `<!` then it is still a comment but a warning will be issued.
+Only the first `MAX_E301` occurrences of `--` in a comment are
+reported, the rest are counted in a single message.
 
 See: <http://www.w3.org/TR/REC-xml/#sec-comments>
 
@@ -10,7 +12,9 @@ See: <http://www.w3.org/TR/REC-xml/#sec-comments>
 
 from lexor.core.parser import NodeParser
 from lexor.core.writer import replace
-from lexor.core.elements import Comment
+
+# Number of `--` reported in each comment.
+MAX_E301 = 5
 
 
 class CommentNP(NodeParser):
@@ -18,18 +22,17 @@ class CommentNP(NodeParser):
 
     def _handle_bogus(self, parser, caret):
         """Helper method for make_node. """
-        self.msg('E100', parser.pos)
-        index = parser.text.find('>', caret+2)
+        parser.line_index.msg(self, 'E100', caret)
+        index = parser.delimiters.find('>', caret+2)
         if index == -1:
             parser.update(parser.end)
-            self.msg('E201', parser.pos)
+            parser.line_index.msg(self, 'E201', parser.end)
             content = parser.text[caret+2:parser.end]
-            return Comment(replace(content, ('--', '- ')))
-        pos = parser.compute(index)
-        self.msg('E300', pos)
+            return parser.nodes.Comment(replace(content, ('--', '- ')))
+        parser.line_index.msg(self, 'E300', index)
         parser.update(index+1)
         content = replace(parser.text[caret+2:index], ('--', '- '))
-        return Comment(content)
+        return parser.nodes.Comment(content)
 
     def make_node(self):
         parser = self.parser
@@ -38,25 +41,37 @@ class CommentNP(NodeParser):
             return None
         if parser.text[caret+2:caret+4] != '--':
             return self._handle_bogus(parser, caret)
-        index = parser.text.find('--', caret+4)
+        index = parser.delimiters.find('--', caret+4)
         if index == -1:
-            self.msg('E200', parser.pos)
+            parser.line_index.msg(self, 'E200', caret)
             parser.update(parser.end)
-            return Comment(parser.text[caret+4:parser.end])
-        content = parser.text[caret+4:index]
+            return parser.nodes.Comment(parser.text[caret+4:parser.end])
+        content = [parser.text[caret+4:index]]
+        num = 0
+        first = None
         while parser.text[index:index+3] != '-->':
-            self.msg('E301', parser.compute(index), tuple(parser.pos))
-            content += '- '
-            newindex = parser.text.find('--', index+1)
+            if num < MAX_E301:
+                parser.line_index.msg(self, 'E301', index, caret)
+            elif num == MAX_E301:
+                first = index
+            num += 1
+            content.append('- ')
+            newindex = parser.delimiters.find('--', index+1)
             if newindex == -1:
-                content += parser.text[index+2:parser.end]
-                self.msg('E200', parser.pos)
+                content.append(parser.text[index+2:parser.end])
+                if first is not None:
+                    parser.line_index.msg(
+                        self, 'E302', first, [num - MAX_E301]
+                    )
+                parser.line_index.msg(self, 'E200', caret)
                 parser.update(parser.end)
-                return Comment(content)
-            content += parser.text[index+2:newindex]
+                return parser.nodes.Comment(''.join(content))
+            content.append(parser.text[index+2:newindex])
             index = newindex
+        if first is not None:
+            parser.line_index.msg(self, 'E302', first, [num - MAX_E301])
         parser.update(index+3)
-        return Comment(content)
+        return parser.nodes.Comment(''.join(content))
 
 
 MSG = {
@@ -65,6 +80,7 @@ MSG = {
     'E201': '`>` not found',
     'E300': '`>` found',
     'E301': '`--` in comment opened at {0}:{1:2}',
+    'E302': '{0} more `--` in comment',
 }
 MSG_EXPLANATION = [
     """
@@ -109,5 +125,12 @@ MSG_EXPLANATION = [
 
     Okay: <!-- 1 - 2 - 3 - 4 - 5 -->
     E301: <!-- 1 -- 2 -- 3 -- 4 -- 5 -->
+""",
+    """
+    - Only the first few occurrences of `--` within a comment are
+      reported. The rest of them are counted in one message.
+
+    Okay: <!-- 1 - 2 - 3 - 4 - 5 - 6 - 7 -->
+    E302: <!-- 1 -- 2 -- 3 -- 4 -- 5 -- 6 -- 7 -->
 """,
 ]
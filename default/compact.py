@@ -0,0 +1,480 @@
+"""XML: COMPACT helper
+
+A `CompactTree` stores a parsed document in a few parallel arrays
+instead of one lexor `Node` object per node. Each node is an index
+into the arrays which hold its kind, its parent, first child and next
+sibling, its position and a reference to its name or data in a table
+of strings. As in the lexor nodes, the position of an element is the
+one of its `pos` attribute, which empty elements do not have. Equal
+strings, such as repeated tag and attribute names, are stored only
+once. The tree is built from the events generated by the
+`EventParser` so no `Node` object is created while parsing:
+
+    tree = CompactTree.from_events(EventParser(), text)
+    for index in tree.children(0):
+        ...
+
+The `NodeView` objects returned by `view` give access to the nodes
+with an interface similar to the one of the lexor nodes and create
+the actual lexor node only when its `node` property is requested.
+
+A tree, along with the messages of the parse, may be saved to a
+binary file and opened again by another process:
+
+    CompactTree.from_node(parser.doc, parser.log).save('doc.lxt')
+    tree = CompactTree.load('doc.lxt')
+
+The file holds a header, the arrays of the tree as they are in memory
+and the table of strings encoded in UTF-8, followed by the messages
+encoded in JSON. `load` maps the file into memory and the arrays of
+the tree read their items from the mapped file, so nothing is read or
+copied until it is needed. The strings are read the first time they
+are requested.
+
+"""
+
+import sys
+import json
+import mmap
+import struct
+from array import array
+from lexor.core import elements
+
+KINDS = [
+    'Document', 'Element', 'Text', 'Entity', 'Comment', 'CData',
+    'DocumentType', 'ProcessingInstruction',
+]
+KIND = dict([(name, num) for num, name in enumerate(KINDS)])
+EVENTS = {
+    'text': KIND['Text'],
+    'entity': KIND['Entity'],
+    'comment': KIND['Comment'],
+    'cdata': KIND['CData'],
+    'doctype': KIND['DocumentType'],
+}
+MAGIC = b'LXT1'
+# magic, byte order, nodes, attributes, strings, size of the strings
+# and size of the messages.
+HEADER = struct.Struct('<4s4sIIIII')
+ORDER = b'LE' if sys.byteorder == 'little' else b'BE'
+ARRAYS = ['parent', 'first', 'next', 'line', 'column', 'value',
+          'extra', 'natt']
+
+
+def _encode(string):
+    """Return `string` encoded in UTF-8. """
+    if isinstance(string, bytes):
+        return string
+    return string.encode('utf-8')
+
+
+def _position(item):
+    """Encode the `Position` objects in the arguments of messages. """
+    return [item.line, item.column]
+
+
+class MappedArray(object):
+    """The `count` items of type `typecode` stored in `buf` from
+    `offset` on, with the byte order given by `order`, `'<'` or `'>'`.
+    The items are unpacked from `buf` when they are requested, so the
+    buffer is not copied. """
+
+    def __init__(self, buf, offset, typecode, count, order):
+        self.buf = buf
+        self.offset = offset
+        self.count = count
+        self.item = struct.Struct(order + typecode)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError('array index out of range')
+        return self.item.unpack_from(
+            self.buf, self.offset + index * self.item.size
+        )[0]
+
+
+def _view(buf, offset, typecode, count, order):
+    """Return the `count` items of type `typecode` in `buf` starting
+    at `offset` without copying them. A `memoryview` is used when it
+    can be cast to the type, which requires Python 3 and the byte
+    order of the machine. """
+    if order == ORDER:
+        size = array(typecode).itemsize * count
+        try:
+            return memoryview(buf)[offset:offset+size].cast(typecode)
+        except (AttributeError, TypeError):
+            pass
+    return MappedArray(buf, offset, typecode, count,
+                       '<' if order == b'LE' else '>')
+
+
+class MappedStrings(object):
+    """The table of strings of a saved tree, which start at `base`
+    in `buf`. The strings are read when they are first requested.
+    They are decoded from UTF-8 on Python 3, on Python 2 they are byte
+    strings like the ones given by the parser. """
+
+    def __init__(self, offsets, buf, base):
+        self.offsets = offsets
+        self.buf = buf
+        self.base = base
+        self.cache = dict()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        try:
+            return self.cache[index]
+        except KeyError:
+            start = self.base + self.offsets[index]
+            end = self.base + self.offsets[index+1]
+            string = self.buf[start:end]
+            if str is not bytes:
+                string = string.decode('utf-8')
+            self.cache[index] = string
+            return string
+
+
+def _tobytes(items):
+    """Return the bytes of the array `items`. """
+    if hasattr(items, 'tobytes'):
+        return items.tobytes()
+    return items.tostring()
+
+
+class CompactTree(object):
+    """A document stored in parallel arrays. The node at index `0`
+    is the document. """
+
+    def __init__(self):
+        self.strings = []
+        self.string_id = dict()
+        self.kind = array('b', [KIND['Document']])
+        self.parent = array('i', [-1])
+        self.first = array('i', [-1])
+        self.next = array('i', [-1])
+        self.line = array('i', [0])
+        self.column = array('i', [0])
+        self.value = array('i', [-1])
+        self.extra = array('i', [-1])
+        self.natt = array('i', [0])
+        self.att_name = array('i')
+        self.att_value = array('i')
+        self._last = array('i', [-1])
+        self.messages = []
+        self.buffer = None
+
+    def __len__(self):
+        return len(self.kind)
+
+    def intern(self, string):
+        """Return the index of `string` in the table of strings. """
+        try:
+            return self.string_id[string]
+        except KeyError:
+            self.string_id[string] = len(self.strings)
+            self.strings.append(string)
+            return len(self.strings) - 1
+
+    def append(self, parent, kind, value, pos, extra=-1):
+        """Add a node as the last child of `parent` and return its
+        index. `value` and `extra` are indices of strings. """
+        index = len(self.kind)
+        self.kind.append(kind)
+        self.parent.append(parent)
+        self.first.append(-1)
+        self.next.append(-1)
+        self.line.append(pos[0])
+        self.column.append(pos[1])
+        self.value.append(value)
+        self.extra.append(extra)
+        self.natt.append(0)
+        self._last.append(-1)
+        last = self._last[parent]
+        if last == -1:
+            self.first[parent] = index
+        else:
+            self.next[last] = index
+        self._last[parent] = index
+        return index
+
+    def set_attributes(self, index, items):
+        """Store the attribute `items` of the element `index`. """
+        self.extra[index] = len(self.att_name)
+        self.natt[index] = len(items)
+        for key, val in items:
+            self.att_name.append(self.intern(key))
+            self.att_value.append(self.intern(val))
+
+    def children(self, index):
+        """Generate the indices of the children of `index`. """
+        crt = self.first[index]
+        while crt != -1:
+            yield crt
+            crt = self.next[crt]
+
+    def name(self, index):
+        """Return the name of the element `index`, or the target of
+        the processing instruction `index`. """
+        kind = self.kind[index]
+        if kind == KIND['Element']:
+            return self.strings[self.value[index]]
+        if kind == KIND['ProcessingInstruction']:
+            return self.strings[self.extra[index]]
+        return None
+
+    def data(self, index):
+        """Return the data of a node which is not an element. """
+        if self.kind[index] in [KIND['Document'], KIND['Element']]:
+            return None
+        return self.strings[self.value[index]]
+
+    def attributes(self, index):
+        """Return a list of `(name, value)` pairs for the element. """
+        if self.kind[index] != KIND['Element']:
+            return []
+        start = self.extra[index]
+        strings = self.strings
+        return [
+            (strings[self.att_name[num]], strings[self.att_value[num]])
+            for num in range(start, start + self.natt[index])
+        ]
+
+    def view(self, index=0):
+        """Return a `NodeView` of the node `index`. """
+        return NodeView(self, index)
+
+    def materialize(self, index):
+        """Create the lexor node `index` along with its descendants. """
+        node = self._make(index)
+        stack = [(node, index)]
+        while stack:
+            parent, crt = stack.pop()
+            for child in self.children(crt):
+                node_child = self._make(child)
+                parent.append_child_node(node_child)
+                if self.first[child] != -1:
+                    stack.append((node_child, child))
+        return node
+
+    def _make(self, index):
+        """Create the lexor node `index` without its children. """
+        kind = KINDS[self.kind[index]]
+        if kind == 'Document':
+            return elements.Document('xml')
+        if kind == 'Element':
+            node = elements.Element(self.name(index))
+            for key, val in self.attributes(index):
+                node[key] = val
+            if self.line[index]:
+                node.pos = (self.line[index], self.column[index])
+            return node
+        if kind == 'ProcessingInstruction':
+            node = elements.ProcessingInstruction(
+                self.name(index), self.data(index)
+            )
+        else:
+            node = getattr(elements, kind)(self.data(index))
+        node.set_position(self.line[index], self.column[index])
+        return node
+
+    def set_messages(self, log):
+        """Keep the messages in `log` as tuples `(module, code,
+        position, arg)`. """
+        self.messages = [
+            (msg['module'], msg['code'], list(msg['position']),
+             msg['arg'])
+            for msg in log.child
+        ]
+
+    def save(self, path):
+        """Write the tree and its messages to the file `path`. """
+        blob = [_encode(string) for string in self.strings]
+        offsets = array('i', [0])
+        for string in blob:
+            offsets.append(offsets[-1] + len(string))
+        blob = b''.join(blob)
+        messages = _encode(json.dumps(self.messages, default=_position))
+        kind = _tobytes(self.kind)
+        with open(path, 'wb') as tmpf:
+            tmpf.write(HEADER.pack(
+                MAGIC, ORDER, len(self.kind),
+                len(self.att_name), len(self.strings), len(blob),
+                len(messages)
+            ))
+            tmpf.write(kind + b'\0' * (-len(kind) % 4))
+            for name in ARRAYS + ['att_name', 'att_value']:
+                tmpf.write(_tobytes(getattr(self, name)))
+            tmpf.write(_tobytes(offsets))
+            tmpf.write(blob)
+            tmpf.write(messages)
+
+    @classmethod
+    def load(cls, path):
+        """Open a tree saved with `save`. The file is mapped into
+        memory and stays open as long as the tree is in use. """
+        tree = cls()
+        with open(path, 'rb') as tmpf:
+            buf = mmap.mmap(tmpf.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, order, nodes, natts, nstrings, nblob, nmessages = \
+            HEADER.unpack(buf[:HEADER.size])
+        if magic != MAGIC:
+            raise ValueError('%s is not a saved tree' % path)
+        order = order.rstrip(b'\0')
+        offset = HEADER.size
+        tree.kind = _view(buf, offset, 'b', nodes, order)
+        offset += nodes + (-nodes % 4)
+        for name in ARRAYS:
+            setattr(tree, name, _view(buf, offset, 'i', nodes, order))
+            offset += 4 * nodes
+        for name in ['att_name', 'att_value']:
+            setattr(tree, name, _view(buf, offset, 'i', natts, order))
+            offset += 4 * natts
+        offsets = _view(buf, offset, 'i', nstrings + 1, order)
+        offset += 4 * (nstrings + 1)
+        tree.strings = MappedStrings(offsets, buf, offset)
+        offset += nblob
+        tree.messages = json.loads(
+            buf[offset:offset+nmessages].decode('utf-8')
+        )
+        tree.string_id = None
+        tree.buffer = buf
+        return tree
+
+    def close(self):
+        """Close the file of a tree opened with `load`. The nodes that
+        were materialized may still be used but the tree may not. """
+        if self.buffer is None:
+            return
+        for name in ['kind', 'att_name', 'att_value'] + ARRAYS:
+            setattr(self, name, None)
+        self.strings = None
+        self.buffer.close()
+        self.buffer = None
+
+    @classmethod
+    def from_node(cls, node, log=None):
+        """Build a tree from the lexor `node` and the messages in
+        `log`. """
+        tree = cls()
+        intern = tree.intern
+        stack = [(child, 0) for child in reversed(node.child)]
+        while stack:
+            crt, parent = stack.pop()
+            if isinstance(crt, elements.Element):
+                pos = getattr(crt, 'pos', None) or (0, 0)
+                index = tree.append(parent, KIND['Element'],
+                                    intern(crt.name), pos)
+                if crt.attlen:
+                    tree.set_attributes(index, list(crt.items()))
+                stack.extend([(child, index)
+                              for child in reversed(crt.child)])
+            elif isinstance(crt, elements.ProcessingInstruction):
+                tree.append(parent, KIND['ProcessingInstruction'],
+                            intern(crt.data), crt.node_position,
+                            intern(crt.target))
+            else:
+                tree.append(parent, KIND[crt.__class__.__name__],
+                            intern(crt.data), crt.node_position)
+        if log is not None:
+            tree.set_messages(log)
+        return tree
+
+    @classmethod
+    def from_events(cls, parser, text, uri=None):
+        """Build a tree from the events generated by the
+        `EventParser` object `parser`. """
+        tree = cls()
+        intern = tree.intern
+        crt = 0
+        for event, value in parser.iterparse(text, uri):
+            if event == 'start':
+                crt = tree.append(
+                    crt, KIND['Element'], intern(value.name),
+                    value.pos or (0, 0)
+                )
+                if value.order:
+                    tree.set_attributes(crt, [
+                        (key, value[key]) for key in value.order
+                    ])
+            elif event == 'end':
+                crt = tree.parent[crt]
+            elif event == 'pi':
+                tree.append(
+                    crt, KIND['ProcessingInstruction'], intern(value[1]),
+                    parser.event_position, intern(value[0])
+                )
+            else:
+                tree.append(crt, EVENTS[event], intern(value),
+                            parser.event_position)
+        tree.set_messages(parser.log)
+        return tree
+
+
+class NodeView(object):
+    """Read-only view of a node in a `CompactTree`. """
+
+    __slots__ = ('tree', 'index', '_node')
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+        self._node = None
+
+    @property
+    def name(self):
+        """The element name or processing instruction target. """
+        return self.tree.name(self.index)
+
+    @property
+    def data(self):
+        """The data of the node if it is not an element. """
+        return self.tree.data(self.index)
+
+    @property
+    def kind(self):
+        """The name of the lexor class of the node. """
+        return KINDS[self.tree.kind[self.index]]
+
+    @property
+    def node_position(self):
+        """The line and column where the node starts. """
+        return self.tree.line[self.index], self.tree.column[self.index]
+
+    @property
+    def child(self):
+        """A list of views of the children. """
+        return [NodeView(self.tree, num)
+                for num in self.tree.children(self.index)]
+
+    @property
+    def node(self):
+        """The lexor node, created on first access. """
+        if self._node is None:
+            self._node = self.tree.materialize(self.index)
+        return self._node
+
+    def items(self):
+        """Return a list of the attribute `(name, value)` pairs. """
+        return self.tree.attributes(self.index)
+
+    def get(self, key, val=''):
+        """Return the value of the attribute `key`. """
+        for name, value in self.tree.attributes(self.index):
+            if name == key:
+                return value
+        return val
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self.child[key]
+        for name, value in self.tree.attributes(self.index):
+            if name == key:
+                return value
+        raise KeyError(key)
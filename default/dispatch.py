@@ -0,0 +1,84 @@
+"""XML: DISPATCH NodeParser
+
+The characters `<` and `&` may start many kinds of nodes. Instead of
+asking each node parser in turn if it can make a node, the parser
+defined in this module looks at the characters following the caret
+and hands the work to the only node parser that can accept it:
+
+    <!--         CommentNP
+    <![CDATA[    CDataNP
+    <!DOCTYPE    DocumentTypeNP
+    <!           CommentNP (bogus comment)
+    <?           ProcessingInstructionNP
+    <name        ElementNP
+    </           EntityNP (stray end tag)
+    &            EntityNP
+
+Whenever a node parser declines the caret, the parser that would have
+been tried next in the ordered list takes over so that the nodes and
+messages are the same as before.
+
+"""
+
+from lexor.core.parser import NodeParser
+
+
+class DispatchNP(NodeParser):
+    """Delegates `make_node` to the node parser in charge of the
+    markup found at the caret. The node parsers have to be declared
+    in the `REPOSITORY` of the style. """
+
+    def __init__(self, parser):
+        NodeParser.__init__(self, parser)
+        self.element = parser['ElementNP']
+        self.cdata = parser['CDataNP']
+        self.doctype = parser['DocumentTypeNP']
+        self.comment = parser['CommentNP']
+        self.pi = parser['ProcessingInstructionNP']
+        self.entity = parser['EntityNP']
+        self.table = {
+            '!': self._handle_bang,
+            '?': self._handle_pi,
+            '/': self._handle_entity,
+        }
+
+    def _handle_bang(self, parser, caret):
+        """Helper function for make_node. """
+        char = parser.text[caret+2:caret+3]
+        if char == '[' and parser.text[caret:caret+9] == '<![CDATA[':
+            return self.cdata.make_node()
+        if char in ['d', 'D']:
+            node = self.doctype.make_node()
+            if node is not None:
+                return node
+        return self.comment.make_node()
+
+    def _handle_pi(self, *_):
+        """Helper function for make_node. """
+        return self.pi.make_node()
+
+    def _handle_entity(self, *_):
+        """Helper function for make_node. """
+        return self.entity.make_node()
+
+    def make_node(self):
+        parser = self.parser
+        caret = parser.caret
+        char = parser.text[caret]
+        if char == '&':
+            return self.entity.make_node()
+        if char != '<':
+            return None
+        char = parser.text[caret+1:caret+2]
+        handler = self.table.get(char)
+        if handler is not None:
+            return handler(parser, caret)
+        if char.isalpha() or char in [":", "_"]:
+            node = self.element.make_node()
+            if node is not None:
+                return node
+        return self.entity.make_node()
+
+    def close(self, node):
+        """Only elements are left open, let `ElementNP` decide. """
+        return self.element.close(node)
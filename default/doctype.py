@@ -7,7 +7,6 @@ See: http://www.w3.org/TR/REC-xml/#dtd
 """
 
 from lexor.core.parser import NodeParser
-from lexor.core.elements import DocumentType
 
 
 class DocumentTypeNP(NodeParser):
@@ -22,14 +21,16 @@ class DocumentTypeNP(NodeParser):
         if char not in ' \t\n\r\f\v':
             return None
         if not parser.text[caret:caret+9].isupper():
-            self.msg('E101', parser.pos, [parser.text[caret+2:caret+9]])
-        index = parser.text.find('>', caret+10)
+            parser.line_index.msg(
+                self, 'E101', caret, [parser.text[caret+2:caret+9]]
+            )
+        index = parser.delimiters.find('>', caret+10)
         if index == -1:
-            self.msg('E100', parser.pos)
+            parser.line_index.msg(self, 'E100', caret)
             parser.update(parser.end)
-            return DocumentType(parser.text[caret+10:parser.end])
+            return parser.nodes.DocumentType(parser.text[caret+10:parser.end])
         parser.update(index+1)
-        return DocumentType(parser.text[caret+10:index])
+        return parser.nodes.DocumentType(parser.text[caret+10:index])
 
 
 MSG = {
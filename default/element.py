@@ -10,15 +10,139 @@ and attributes. For instance,
 is an element of name 'tagname' and has attributes `att1` and `att2`.
 All values in xml must be enclosed within quotes.
 
+The elements in progress are kept in an `OpenElements` stack which
+finds the element closed by a closing tag from its name, so the work
+done at each step of the parse does not grow with the depth of the
+document. The options `max_depth` and `max_elements` of the style
+stop the parse once the elements are nested too deep or once there
+are too many of them.
+
 """
 
 import re
 from lexor.core.parser import NodeParser
-from lexor.core.elements import Element
+from lexor.util import Position
 
 RE = re.compile(r'.*?[ \t\n\r\f\v/>]')
 RE_NOSPACE = re.compile(r"\s*")
 RE_NEXT = re.compile(r'.*?[ \t\n\r\f\v/>=]')
+RE_ATT = re.compile(
+    r'[ \t\n\r\f\v]+([^ \t\n\r\f\v/>=]+)[ \t\n\r\f\v]*=[ \t\n\r\f\v]*'
+    r'(?:"([^"]*)"|\'([^\']*)\')'
+)
+RE_TAIL = re.compile(r'[ \t\n\r\f\v]*(/?)')
+
+
+class OpenElements(object):
+    """Explicit stack of the elements in progress, which takes the
+    place of the `_close_node` method of the parser. The parser asks
+    each element in progress, starting with the innermost one, if the
+    text at the caret closes it. Instead, the name in a closing tag
+    is looked up among the names of the open elements. A limit of `0`
+    means that there is no limit. When a limit stops the parse, the
+    elements in progress at that point are kept in `stopped`.
+
+    lexor has no public access to the elements in progress, so the
+    stack follows the private list `parser._in_progress`. The parser
+    only appends to the list, when it creates an element, and empties
+    it at the start of a parse, before `pre_process` creates this
+    object. The elements are only removed by `close_node`, which takes
+    the place of the only method of the parser removing them. The
+    names of the elements appended since the last call are taken from
+    the end of the list by `sync`. """
+
+    def __init__(self, parser, max_depth=0, max_elements=0):
+        self.parser = parser
+        self.max_depth = max_depth
+        self.max_elements = max_elements
+        self.elements = 0
+        self.stopped = []
+        self.names = []
+        self.levels = dict()
+        self.longest = 0
+
+    def sync(self):
+        """Push the elements the parser opened since the last call. """
+        # pylint: disable=protected-access
+        progress = self.parser._in_progress
+        for num in range(len(self.names), len(progress)):
+            name = progress[num][0].name
+            self.names.append(name)
+            self.levels.setdefault(name, []).append(num)
+            if len(name) > self.longest:
+                self.longest = len(name)
+
+    def pop(self, num):
+        """Remove the elements from the level `num` onwards. """
+        for name in self.names[num:]:
+            self.levels[name].pop()
+        del self.names[num:]
+        # pylint: disable=protected-access
+        del self.parser._in_progress[num:]
+
+    def match(self):
+        """Return the level of the innermost open element named in the
+        closing tag at the caret or `None`. """
+        parser = self.parser
+        # pylint: disable=protected-access
+        caret = parser.caret
+        if not parser._in_progress or parser.text[caret:caret+2] != '</':
+            return None
+        self.sync()
+        end = parser.delimiters.find('>', caret+2, caret+3+self.longest)
+        if end == -1:
+            return None
+        levels = self.levels.get(parser.text[caret+2:end])
+        if not levels:
+            return None
+        return levels[-1]
+
+    def close_node(self):
+        """Close the innermost open element named in the closing tag
+        at the caret, along with the elements opened after it. Returns
+        the node in which the parse continues or `None` if the caret
+        is not at the closing tag of an open element. """
+        num = self.match()
+        if num is None:
+            return None
+        parser = self.parser
+        # pylint: disable=protected-access
+        progress = parser._in_progress
+        node, processor = progress[num]
+        autoclose = processor.close(node)
+        if autoclose is None:
+            return None
+        for index in range(len(progress)-1, num, -1):
+            child = progress[index][0]
+            parser.msg(
+                'lexor.core.parser', 'W100', child.node_position,
+                (child.name, Position(autoclose))
+            )
+        self.pop(num)
+        if progress:
+            return progress[-1][0]
+        return parser.doc
+
+    def admit(self, nparser, caret):
+        """Count the element starting at `caret`. If it goes over one
+        of the limits then the parse is stopped and `False` is
+        returned. """
+        parser = self.parser
+        self.elements += 1
+        # pylint: disable=protected-access
+        depth = len(parser._in_progress)
+        if self.max_elements and self.elements > self.max_elements:
+            parser.line_index.msg(nparser, 'E161', caret,
+                                  [self.max_elements])
+        elif self.max_depth and depth >= self.max_depth:
+            parser.line_index.msg(nparser, 'E160', caret,
+                                  [self.max_depth])
+        else:
+            return True
+        self.stopped = parser._in_progress[:]
+        self.pop(0)
+        parser.update(parser.end)
+        return False
 
 
 class ElementNP(NodeParser):
@@ -32,12 +156,12 @@ class ElementNP(NodeParser):
             return None
         char = parser.text[caret+1:caret+2]
         if char.isalpha() or char in [":", "_"]:
-            endindex = parser.text.find('>', caret+1)
+            endindex = parser.delimiters.find('>', caret+1)
             if endindex == -1:
                 return None
-            start = parser.text.find('<', caret+1)
-            if start != -1 and start < endindex:
-                self.msg('E100', parser.pos, parser.compute(start))
+            start = parser.delimiters.find('<', caret+1, endindex)
+            if start != -1:
+                parser.line_index.msg(self, 'E100', caret, start)
                 return None
         else:
             return None
@@ -51,7 +175,10 @@ class ElementNP(NodeParser):
             return None
         pos = parser.copy_pos()
         match = RE.search(parser.text, caret+1)
-        node = Element(parser.text[parser.caret+1:match.end(0)-1])
+        if not parser.open_elements.admit(self, caret):
+            return parser.nodes.Text('')
+        name = parser.text[caret+1:match.end(0)-1]
+        node = parser.nodes.Element(parser.names.setdefault(name, name))
         parser.update(match.end(0)-1)
         if parser.text[parser.caret] is '>':
             parser.update(parser.caret+1)
@@ -65,16 +192,18 @@ class ElementNP(NodeParser):
         return node
 
     def close(self, node):
-        """Return the position where the element was closed. """
+        """Return the position where the element was closed. The
+        closing tag is compared in place with the name of the node. """
         parser = self.parser
         caret = parser.caret
         if parser.text[caret] != '<':
             return None
         if parser.text[caret+1:caret+2] == '/':
-            index = parser.text.find('>', caret+2)
-            if index == -1:
+            name = node.name
+            index = caret + 2 + len(name)
+            if parser.text[index:index+1] != '>':
                 return None
-            if parser.text[caret+2:index] == node.name:
+            if parser.text.find(name, caret+2, index) == caret+2:
                 pos = parser.copy_pos()
                 parser.update(index+1)
                 return pos
@@ -85,7 +214,7 @@ class ElementNP(NodeParser):
         if parser.text[index] == '/':
             parser.update(end+1)
             if end - index > 1:
-                self.msg('E120', parser.compute(index))
+                parser.line_index.msg(self, 'E120', index)
             return True
         return False
 
@@ -101,7 +230,7 @@ class ElementNP(NodeParser):
             return prop, prop_index, False, False
         prop_index = match.end(0)
         if prop_index - parser.caret == 0 and node.attlen > 0:
-            self.msg('E130', parser.pos)
+            parser.line_index.msg(self, 'E130', parser.caret)
         match = RE_NEXT.search(parser.text, prop_index, end)
         if match is None:
             prop = parser.text[prop_index:end]
@@ -135,25 +264,55 @@ class ElementNP(NodeParser):
             quote = parser.text[val_index]
             index = parser.text.find(quote, val_index+1, end)
             if index == -1:
-                self.msg('E132', parser.pos, parser.compute(end))
+                parser.line_index.msg(self, 'E132', parser.caret, end)
                 parser.update(end+1)
                 return parser.text[val_index+1:end]
             parser.update(index+1)
             return parser.text[val_index+1:index]
         else:
-            pos = parser.copy_pos()
-            self.msg('E131', parser.compute(val_index))
+            start = parser.caret
+            parser.line_index.msg(self, 'E131', val_index)
             match = RE.search(parser.text, val_index, end)
             if match is None:
                 parser.update(end+1)
                 return parser.text[val_index:end]
             if parser.text[match.end(0)-1] == '/':
-                self.msg('E140', pos)
+                parser.line_index.msg(self, 'E140', start)
                 parser.update(match.end(0)-1)
             else:
                 parser.update(match.end(0)-1)
             return parser.text[val_index:match.end(0)-1]
 
+    def read_fast(self, parser, node, end):
+        """Read the attributes in
+
+            parser.text[parser.caret:end]
+
+        in one pass assuming they are well formed. Returns `None`
+        without modifying the parser or the node if they are not,
+        otherwise it returns True if the Element is empty. """
+        text = parser.text
+        index = parser.caret
+        items = []
+        for match in RE_ATT.finditer(text, index, end):
+            if match.start() != index:
+                return None
+            prop, val, sval = match.groups()
+            if val is None:
+                val = sval
+            items.append((prop, val))
+            index = match.end()
+        match = RE_TAIL.match(text, index, end)
+        if match.end() != end:
+            return None
+        if len(set([prop for prop, _ in items])) != len(items):
+            return None
+        names = parser.names
+        for prop, val in items:
+            node[names.setdefault(prop, prop)] = val
+        parser.update(end+1)
+        return match.group(1) == '/'
+
     def read_attributes(self, parser, node, end):
         """Parses the string
 
@@ -165,17 +324,22 @@ class ElementNP(NodeParser):
             att1="val1" att2="val2" ...
 
         This function returns True if the Element is empty, that is, if
-        the opening tag ends with `/`. """
+        the opening tag ends with `/`. The attributes are read one at a
+        time, reporting the errors, only if `read_fast` fails. """
+        empty = self.read_fast(parser, node, end)
+        if empty is not None:
+            return empty
         while parser.caret < end:
             prop, prop_index, implied, empty = self.read_prop(
                 parser, node, end
             )
             if prop is None:
                 return empty
+            prop = parser.names.setdefault(prop, prop)
             if prop in node:
-                self.msg('E150', parser.compute(prop_index), [prop])
+                parser.line_index.msg(self, 'E150', prop_index, [prop])
             if implied is True:
-                self.msg('E151', parser.compute(prop_index))
+                parser.line_index.msg(self, 'E151', prop_index)
                 node[prop] = ""
                 if empty is True:
                     return empty
@@ -193,7 +357,9 @@ MSG = {
     'E132': 'assuming quoted attribute to close at {0}:{1:2}',
     'E140': '`/` found in unquoted attribute value',
     'E150': 'attribute name "{0}" has already been declared',
-    'E151': 'XML does not support implied attributes.'
+    'E151': 'XML does not support implied attributes.',
+    'E160': 'elements nested deeper than {0} levels, parse stopped',
+    'E161': 'more than {0} elements, parse stopped',
 }
 MSG_EXPLANATION = [
     """
@@ -245,6 +411,20 @@ MSG_EXPLANATION = [
     E140: <img href=path/to/image.png />
     E151: <tag att1 att2="val2">content</tag>
 
+""",
+    """
+    - The parse stops at the first element nested deeper than the
+      `max_depth` option of the style (E160) or at the element after
+      the first `max_elements` elements (E161). The nodes parsed up
+      to that point are kept. Both options are `0`, no limit, by
+      default. The examples below assume a `max_depth` of `3` and a
+      `max_elements` of `5`.
+
+    Okay: <a><b><c/></b></a>
+    Okay: <a/><b/><c/><d/><e/>
+
+    E160: <a><b><c><d/></c></b></a>
+    E161: <a/><b/><c/><d/><e/><f/>
 """,
 ]
 
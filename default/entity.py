@@ -2,15 +2,62 @@
 
 Some characters are reserved in XML: `<` and `&`. To be able
 to display them we need to use XML entities. The parser defined
-in this module looks for such entities.
+in this module looks for such entities. An entity ends at the first
+`;` and cannot contain whitespace or a `<`, otherwise the `&` is
+reported as a stray character.
+
+With the `decode_entities` option the predefined entities and the
+character references are replaced by the characters they stand for
+and become part of the surrounding text. Other entities are kept as
+`Entity` nodes. The characters are of the same type as the text, in
+a byte string they are encoded in UTF-8. The decoded entities are
+remembered in a table of at most `MAX_MEMO` entries.
 
 """
 
 import re
 from lexor.core.parser import NodeParser
-from lexor.core.elements import Entity, Text
 
-RE = re.compile('.*?[ \t\n\r\f\v;]')
+try:
+    CHR = unichr
+except NameError:
+    CHR = chr
+
+RE = re.compile('[^<]*?[ \t\n\r\f\v;<]')
+RE_REF = re.compile('&#(?:([0-9]+)|[xX]([0-9a-fA-F]+));$')
+PREDEFINED = {
+    '&amp;': '&',
+    '&lt;': '<',
+    '&gt;': '>',
+    '&quot;': '"',
+    '&apos;': "'",
+}
+MAX_MEMO = 512
+
+
+def decode(entity):
+    """Return the character `entity` stands for or `None` if it is
+    not a predefined entity or a valid character reference. If
+    `entity` is a byte string then so is the character, encoded in
+    UTF-8. """
+    if entity in PREDEFINED:
+        return PREDEFINED[entity]
+    match = RE_REF.match(entity)
+    if match is None:
+        return None
+    if match.group(1) is not None:
+        code = int(match.group(1))
+    else:
+        code = int(match.group(2), 16)
+    if not 0 < code < 0x110000:
+        return None
+    try:
+        char = CHR(code)
+        if not isinstance(entity, type(char)):
+            char = char.encode('utf-8')
+    except (ValueError, UnicodeError):
+        return None
+    return char
 
 
 class EntityNP(NodeParser):
@@ -18,37 +65,55 @@ class EntityNP(NodeParser):
     called only after all the other parsers have attempted to decide
     what to do with `<` and `&`."""
 
+    def __init__(self, parser):
+        NodeParser.__init__(self, parser)
+        self.memo = dict()
+
+    def _entity(self, parser, entity):
+        """Return the node for `entity`. """
+        if not parser.decode_entities:
+            return parser.nodes.Entity(entity)
+        try:
+            char = self.memo[entity]
+        except KeyError:
+            if len(self.memo) >= MAX_MEMO:
+                self.memo.clear()
+            char = self.memo[entity] = decode(entity)
+        if char is None:
+            return parser.nodes.Entity(entity)
+        return parser.nodes.Text(char)
+
     def _handle_lt(self, parser, caret):
         """Helper function for make_node. """
         if parser.text[caret+1:caret+2] == '/':
-            tmp = parser.text.find('>', caret+2)
+            tmp = parser.delimiters.find('>', caret+2)
             if tmp == -1:
-                self.msg('E100', parser.pos, ['<'])
+                parser.line_index.msg(self, 'E100', caret, ['<'])
                 parser.update(caret+1)
-                return Entity('&lt;')
+                return self._entity(parser, '&lt;')
             else:
                 stray_endtag = parser.text[caret:tmp+1]
-                self.msg('E101', parser.pos, [stray_endtag])
+                parser.line_index.msg(self, 'E101', caret, [stray_endtag])
                 parser.update(tmp+1)
-                return Text('')
+                return parser.nodes.Text('')
         else:
-            self.msg('E100', parser.pos, ['<'])
+            parser.line_index.msg(self, 'E100', caret, ['<'])
             parser.update(caret+1)
-            return Entity('&lt;')
+            return self._entity(parser, '&lt;')
 
     def _handle_amp(self, parser, caret):
         """Helper function for make_node. """
         match = RE.search(parser.text, caret)
         if not match:
-            self.msg('E100', parser.pos, ['&'])
+            parser.line_index.msg(self, 'E100', caret, ['&'])
             parser.update(caret+1)
-            return Entity('&amp;')
+            return self._entity(parser, '&amp;')
         if parser.text[match.end()-1] != ';':
-            self.msg('E100', parser.pos, ['&'])
+            parser.line_index.msg(self, 'E100', caret, ['&'])
             parser.update(caret+1)
-            return Entity('&amp;')
+            return self._entity(parser, '&amp;')
         parser.update(match.end())
-        return Entity(parser.text[caret:match.end()])
+        return self._entity(parser, parser.text[caret:match.end()])
 
     def make_node(self):
         parser = self.parser
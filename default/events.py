@@ -0,0 +1,247 @@
+"""XML: EVENTS helper
+
+The node parsers of this style create their nodes through the classes
+found in `parser.nodes`. The `EventParser` defined in this module
+replaces those classes by functions returning light weight tuples so
+that a document can be read as a sequence of events without building
+the document tree. The scanning and the messages are the ones of the
+node parsers. The events are tuples of the form `(event, value)`:
+
+    ('start', StartTag)         StartTag has `name` and attributes
+    ('end', name)
+    ('text', data)
+    ('entity', data)
+    ('comment', data)
+    ('cdata', data)
+    ('doctype', data)
+    ('pi', (target, data))
+
+For instance,
+
+    parser = EventParser()
+    for event, value in parser.iterparse(text):
+        if event == 'start' and value.name == 'price':
+            ...
+    parser.log
+
+Adjacent text is always given in one `text` event and, with the
+`strip_whitespace` option, text made only of whitespace is skipped.
+An `end` event is generated for each `start` event, even for the
+elements that were not closed in the text or when the parse is stopped
+by the `max_depth` or `max_elements` options. While an event is being
+handled, the `event_position` attribute of the parser holds the
+position where the node, or the closing tag, of the event starts.
+
+"""
+
+import re
+from lexor.core.parser import Parser
+from lexor.core.elements import Document
+from lexor.command.lang import map_explanations
+from lexor.util import Position
+
+RE_NEXT = re.compile('[<&]')
+CORE = Parser.__module__
+
+
+class StartTag(dict):
+    """Name and attributes of an opening tag. To the node parsers it
+    looks like an `Element`. The parser recognizes it as a `dict`,
+    not as a `StartTag`, since lexor may load this module again and
+    create a new `StartTag` class while a parser is still in use. """
+
+    def __init__(self, name):
+        dict.__init__(self)
+        self.name = name
+        self.order = []
+        self.pos = None
+
+    def __setitem__(self, key, val):
+        if key not in self:
+            self.order.append(key)
+        dict.__setitem__(self, key, val)
+
+    @property
+    def attlen(self):
+        """The number of attributes. """
+        return len(self.order)
+
+    @property
+    def attributes(self):
+        """Return a list of the attribute names in the order they
+        were declared. """
+        return list(self.order)
+
+
+# pylint: disable=invalid-name
+class EventNodes(object):
+    """Stands in for `lexor.core.elements` in the node parsers. """
+
+    Element = StartTag
+
+    @staticmethod
+    def Text(data=''):
+        """Return a text event. """
+        return 'text', data
+
+    @staticmethod
+    def Entity(data=''):
+        """Return an entity event. """
+        return 'entity', data
+
+    @staticmethod
+    def Comment(data=''):
+        """Return a comment event. """
+        return 'comment', data
+
+    @staticmethod
+    def CData(data=''):
+        """Return a cdata event. """
+        return 'cdata', data
+
+    @staticmethod
+    def DocumentType(data=''):
+        """Return a doctype event. """
+        return 'doctype', data
+
+    @staticmethod
+    def ProcessingInstruction(target, data=''):
+        """Return a processing instruction event. """
+        return 'pi', (target, data)
+
+
+class EventParser(Parser):
+    """A lexor `Parser` for xml in the default style which generates
+    events instead of a document. """
+
+    nodes = EventNodes
+
+    def __init__(self, defaults=None):
+        Parser.__init__(self, 'xml', 'default', defaults)
+        self.event_position = None
+
+    def parse(self, text, uri=None):
+        """Go through the events of `text` without keeping them. This
+        only fills the `log`. """
+        for _ in self.iterparse(text, uri):
+            pass
+
+    def iterparse(self, text, uri=None):
+        """Generate the events in `text`. The messages are available
+        in `log` once the generator is exhausted. """
+        if self._reload:
+            self.load_node_parsers()
+        self.text = text
+        self.end = len(text)
+        self.pos = [1, 1]
+        self.caret = 0
+        self.doc = None
+        if uri:
+            self._uri = uri
+        else:
+            self._uri = 'string@0x%x' % id(text)
+        self.log = Document("lexor", "log")
+        self.log.modules = dict()
+        self.log.explanation = dict()
+        self.style_module.pre_process(self)
+        for event in self._events():
+            yield event
+        self.style_module.post_process(self)
+        map_explanations(self.log.modules, self.log.explanation)
+
+    def _read_text(self):
+        """Return the text up to the next `<` or `&`. """
+        match = RE_NEXT.search(self.text, self.caret)
+        if match is None:
+            index = self.end
+        else:
+            index = match.start()
+            if index == self.caret:
+                index += 1
+        content = self.text[self.caret:index]
+        self.update(index)
+        return content
+
+    def _text_events(self, text, pos):
+        """Return a list with the event for the pieces of text in
+        `text`, which start at `pos`. """
+        data = ''.join(text)
+        if self.strip_whitespace and data.isspace():
+            return []
+        self.event_position = pos
+        return [('text', data)]
+
+    def _close_tags(self):
+        """Return the names of the elements closed at the caret and
+        the position of the closing tag. """
+        num = self.open_elements.match()
+        if num is None:
+            return None
+        stack = self._in_progress
+        autoclose = self['ElementNP'].close(stack[num][0])
+        if autoclose is None:
+            return None
+        names = []
+        for tag, _ in reversed(stack[num+1:]):
+            self.msg(CORE, 'W100', tag.pos, (tag.name, Position(autoclose)))
+            names.append(tag.name)
+        names.append(stack[num][0].name)
+        self.open_elements.pop(num)
+        return names, autoclose
+
+    def _events(self):
+        """Helper function for iterparse. """
+        processors = self._np['__default__']
+        stack = self._in_progress = []
+        text = []
+        text_pos = None
+        while self.caret < self.end:
+            if stack:
+                closed = self._close_tags()
+                if closed is not None:
+                    if text:
+                        for event in self._text_events(text, text_pos):
+                            yield event
+                        text = []
+                    self.event_position = closed[1]
+                    for name in closed[0]:
+                        yield 'end', name
+                    continue
+            pos = self.copy_pos()
+            node = None
+            for processor in processors:
+                node = processor.make_node()
+                if node is not None:
+                    break
+            if node is None:
+                if not text:
+                    text_pos = pos
+                text.append(self._read_text())
+                continue
+            if isinstance(node, tuple) and node[0] == 'text':
+                if node[1]:
+                    if not text:
+                        text_pos = pos
+                    text.append(node[1])
+                continue
+            if text:
+                for event in self._text_events(text, text_pos):
+                    yield event
+                text = []
+            self.event_position = pos
+            if isinstance(node, list):
+                yield 'start', node[0]
+                yield 'end', node[0].name
+            elif isinstance(node, dict):
+                stack.append((node, processor))
+                yield 'start', node
+            else:
+                yield node
+        if text:
+            for event in self._text_events(text, text_pos):
+                yield event
+        self.event_position = self.copy_pos()
+        for tag, _ in stack:
+            self.msg(CORE, 'E100', tag.pos, [tag.name])
+        for tag, _ in reversed(self.open_elements.stopped + stack):
+            yield 'end', tag.name
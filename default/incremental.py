@@ -0,0 +1,279 @@
+"""XML: INCREMENTAL helper
+
+Editors need the messages of a document after every change made to
+it. The `IncrementalParser` keeps the document split in the pieces
+used by the `StreamParser`: each piece ends where a top-level node
+ends and is parsed on its own, starting at its position in the
+document, which gives the same nodes and messages as parsing the
+whole document. After an edit only the pieces touched by it are
+parsed again, the scan stops as soon as it reaches the end of a piece
+that was not touched and the nodes and messages of the remaining
+pieces are moved to their new positions:
+
+    inc = IncrementalParser(Parser('xml', 'default'), 'file.xml')
+    inc.parse(text)
+    inc.edit(120, 3, 'new text')
+    inc.doc, inc.log
+
+The pieces are top-level nodes, so a document with a single root
+element is parsed again as a whole. Message arguments which are
+positions, given as `Position` objects or `[line, column]` lists,
+are moved along with the messages.
+
+"""
+
+from lexor.core import elements
+from lexor.core.parser import Parser
+from lexor.command.lang import map_explanations
+from lexor.util import Position
+
+CORE = Parser.__module__
+
+
+def origin_of(text, index):
+    """Return the position `(line, column)` of `index` in `text`. """
+    return text.count('\n', 0, index) + 1, index - text.rfind('\n', 0, index)
+
+
+class Piece(object):
+    """The nodes and messages of `text[start:end]`, which starts at
+    the position `origin`. `complete` is `False` for the last piece
+    if the text ends before its node does. """
+
+    __slots__ = ('start', 'end', 'origin', 'complete', 'nodes',
+                 'messages')
+
+    def __init__(self, start, end, origin, complete, nodes, messages):
+        self.start = start
+        self.end = end
+        self.origin = origin
+        self.complete = complete
+        self.nodes = nodes
+        self.messages = messages
+
+
+class Shift(object):
+    """Moves the positions after an edit. The positions on `line`
+    move by `dline` lines and `dcol` columns, the positions on the
+    lines after it only move by `dline` lines. Positions that were
+    never set, on line 0, stay where they are. """
+
+    def __init__(self, line, dline, dcol):
+        self.line = line
+        self.dline = dline
+        self.dcol = dcol
+
+    def __call__(self, pos):
+        """Return the new position of `pos`. """
+        if pos[0] == 0:
+            return [pos[0], pos[1]]
+        if pos[0] == self.line:
+            return [pos[0] + self.dline, pos[1] + self.dcol]
+        return [pos[0] + self.dline, pos[1]]
+
+    def nodes(self, nodes):
+        """Move the `nodes` and their descendants. """
+        stack = list(nodes)
+        while stack:
+            node = stack.pop()
+            node.line, node.column = self([node.line, node.column])
+            pos = getattr(node, 'pos', None)
+            if pos is not None:
+                node.pos = tuple(self(pos))
+            if node.child:
+                stack.extend(node.child)
+
+    def arg(self, arg):
+        """Return the message argument `arg` with its positions
+        moved. """
+        if not isinstance(arg, (list, tuple)):
+            return arg
+        if len(arg) == 2 and isinstance(arg[0], int) and \
+                isinstance(arg[1], int):
+            return self(arg)
+        return type(arg)([
+            Position(self([item.line, item.column]), item.fmt)
+            if isinstance(item, Position) else item
+            for item in arg
+        ])
+
+    def messages(self, messages):
+        """Return the `messages` at their new positions. """
+        return [
+            (mod_name, code, self(pos), self.arg(arg))
+            for mod_name, code, pos, arg in messages
+        ]
+
+
+class IncrementalParser(object):
+    """Keeps the result of parsing a text with a lexor `Parser` set
+    to parse xml in the default style up to date with the edits made
+    to the text. """
+
+    def __init__(self, parser, uri=None):
+        self.parser = parser
+        self.uri = uri
+        if uri is None:
+            self.uri = 'incremental@0x%x' % id(self)
+        if parser.style_module is None:
+            parser.load_node_parsers()
+        self.scanner_class = parser.style_module.MOD['scan'].Scanner
+        self.text = ''
+        self.pieces = []
+        self.doc = elements.Document('xml')
+        self.doc.uri_ = self.uri
+        self.log = None
+
+    def _parse_piece(self, start, end, origin, complete):
+        """Parse `text[start:end]` and return a `Piece`. """
+        parser = self.parser
+        parser.origin_ = origin
+        try:
+            parser.parse(self.text[start:end], self.uri)
+        finally:
+            parser.origin_ = None
+        messages = [
+            (msg['module'], msg['code'], list(msg['position']),
+             msg['arg'])
+            for msg in parser.log.child
+        ]
+        return Piece(start, end, origin, complete, list(parser.doc.child),
+                     messages)
+
+    def _scan(self, start, stop=None):
+        """Parse the pieces starting at `start`. Returns the new
+        pieces and the index of the old piece where the scan stopped.
+        `stop` maps the ends of the old pieces which may be kept to
+        their index. """
+        text = self.text
+        scanner = self.scanner_class(text)
+        scanner.caret = start
+        origin = origin_of(text, start)
+        pieces = []
+        while True:
+            end = scanner.next_boundary()
+            if end == -1:
+                if start < len(text):
+                    pieces.append(
+                        self._parse_piece(start, len(text), origin, False)
+                    )
+                return pieces, None
+            pieces.append(self._parse_piece(start, end, origin, True))
+            if stop and end in stop:
+                return pieces, stop[end]
+            nlines = text.count('\n', start, end)
+            if nlines:
+                origin = (origin[0] + nlines, end - text.rfind('\n', 0, end))
+            else:
+                origin = (origin[0], origin[1] + end - start)
+            start = end
+
+    def parse(self, text):
+        """Parse `text` from scratch. """
+        self.text = text
+        old = [node for piece in self.pieces for node in piece.nodes]
+        self.pieces, _ = self._scan(0)
+        self._splice(0, old, self.pieces)
+        self._make_log()
+
+    def edit(self, offset, removed, inserted):
+        """Replace the `removed` characters of the text at `offset`
+        by the string `inserted` and update the result. """
+        pieces = self.pieces
+        delta = len(inserted) - removed
+        first = 0
+        while first < len(pieces) and pieces[first].end <= offset:
+            first += 1
+        if first == len(pieces) and pieces and not pieces[-1].complete:
+            first -= 1
+        start = pieces[first].start if first < len(pieces) else len(
+            self.text)
+        stop = dict([
+            (piece.end + delta, num)
+            for num, piece in enumerate(pieces)
+            if num >= first and piece.end >= offset + removed and
+            piece.complete
+        ])
+        self.text = '%s%s%s' % (
+            self.text[:offset], inserted, self.text[offset+removed:]
+        )
+        new, last = self._scan(start, stop)
+        tail = []
+        if last is not None:
+            tail = pieces[last+1:]
+        old = [node for piece in pieces[first:len(pieces) - len(tail)]
+               for node in piece.nodes]
+        if tail:
+            self._move(tail, new[-1], delta)
+        self.pieces = pieces[:first] + new + tail
+        self._splice(
+            sum([len(piece.nodes) for piece in pieces[:first]]), old, new
+        )
+        self._make_log()
+
+    def _move(self, tail, previous, delta):
+        """Move the pieces in `tail`, which now follow the piece
+        `previous`, by `delta` characters. """
+        text = self.text
+        start = previous.end
+        nlines = text.count('\n', previous.start, start)
+        if nlines:
+            origin = (previous.origin[0] + nlines,
+                      start - text.rfind('\n', 0, start))
+        else:
+            origin = (previous.origin[0],
+                      previous.origin[1] + start - previous.start)
+        line, column = tail[0].origin
+        shift = Shift(line, origin[0] - line, origin[1] - column)
+        moved = shift.dline != 0 or shift.dcol != 0
+        for piece in tail:
+            piece.start += delta
+            piece.end += delta
+            if moved:
+                piece.origin = tuple(shift(piece.origin))
+                shift.nodes(piece.nodes)
+                piece.messages = shift.messages(piece.messages)
+
+    def _splice(self, index, old, pieces):
+        """Replace the `old` nodes of the document, starting at its
+        child `index`, with the nodes of the `pieces`. """
+        doc = self.doc
+        nodes = [node for piece in pieces for node in piece.nodes]
+        for node in old:
+            node.disconnect()
+        doc.child[index:index+len(old)] = nodes
+        for num, node in enumerate(nodes):
+            node.set_parent(doc, index + num)
+        if len(nodes) == len(old) and index + len(nodes) < len(doc.child):
+            last = index + len(nodes) + 1
+        else:
+            last = len(doc.child)
+        prev = doc.child[index-1] if index > 0 else None
+        for num in range(index, last):
+            node = doc.child[num]
+            node.index = num
+            node.prev = prev
+            node.next = None
+            if prev is not None:
+                prev.next = node
+            prev = node
+
+    def _make_log(self):
+        """Gather the messages of the pieces in a new log. The
+        elements left open are reported last, as in a full parse. """
+        parser = self.parser
+        parser.log = elements.Document("lexor", "log")
+        parser.log.modules = dict()
+        parser.log.explanation = dict()
+        unclosed = []
+        for piece in self.pieces:
+            for mod_name, code, pos, arg in piece.messages:
+                if mod_name == CORE and code == 'E100':
+                    unclosed.append((pos, arg))
+                else:
+                    parser.msg(mod_name, code, pos, arg, self.uri)
+        for pos, arg in unclosed:
+            parser.msg(CORE, 'E100', pos, arg, self.uri)
+        map_explanations(parser.log.modules, parser.log.explanation)
+        parser.doc = self.doc
+        self.log = parser.log
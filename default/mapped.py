@@ -0,0 +1,51 @@
+"""XML: MAPPED helper
+
+Large files do not need to be read into a string before they are
+parsed. The object returned by `open_mapped` is a memory-mapped view
+of the file which may be given to `Parser.parse` in place of the
+text:
+
+    text = open_mapped('archive.xml')
+    parser.parse(text, 'archive.xml')
+
+All the searches done by the parser and the node parsers run directly
+on the mapped buffer and only the slices that become node names,
+attribute values and character data are copied out of it.
+
+"""
+
+import mmap
+
+# Largest slice copied out of the buffer when counting.
+CHUNK = 1 << 20
+
+
+class MappedText(mmap.mmap):
+    """A read-only `mmap` which provides the string methods used by
+    the parser that `mmap` lacks. """
+
+    def count(self, sub, start=0, end=None):
+        """Return the number of occurrences of `sub` in
+
+            self[start:end]
+
+        Assumes `sub` is a single character. """
+        if end is None or end > len(self):
+            end = len(self)
+        total = 0
+        while start < end:
+            stop = min(start + CHUNK, end)
+            total += self[start:stop].count(sub)
+            start = stop
+        return total
+
+
+def open_mapped(path):
+    """Map the file in `path` into memory and return a `MappedText`
+    object. Empty files cannot be mapped, in which case an empty
+    string is returned. """
+    with open(path, 'rb') as tmpf:
+        tmpf.seek(0, 2)
+        if tmpf.tell() == 0:
+            return ''
+        return MappedText(tmpf.fileno(), 0, access=mmap.ACCESS_READ)
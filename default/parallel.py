@@ -0,0 +1,192 @@
+"""XML: PARALLEL helper
+
+Documents made of a root element with many children may be parsed
+with a pool of processes. A quick scan of the markup finds the places
+in between the children of the root where the text can be cut. The
+pieces are parsed by the worker processes, each one starting at the
+position of the piece in the document, and the results are put
+together in order. The document and messages are the same as the
+ones obtained by `parser.parse`.
+
+    parse(Parser('xml', 'default'), text, 'file.xml', processes=4)
+
+If the root element is not closed or a closing tag would close more
+than one element, then the pieces could be parsed differently than
+the whole document. In that case the document is parsed serially.
+
+"""
+
+import multiprocessing
+from lexor.core import elements
+from lexor.core.parser import Parser
+from lexor.command.lang import map_explanations
+
+# Parser used by a worker process.
+PARSER = None
+
+
+def _markup_end(parser):
+    """Return the `markup_end` function of the style. """
+    if parser.style_module is None:
+        parser.load_node_parsers()
+    return parser.style_module.MOD['scan'].markup_end
+
+
+def split(text, size, markup_end):
+    """Return a tuple `(name, start, cuts, stop, end)` where `name`
+    is the name of the root element, `text[start:stop]` is its
+    content and `text[stop:end]` its closing tag. The content may be
+    cut at the indices in `cuts`, which are at least `size` apart.
+    Returns `None` if the text cannot be cut safely. """
+    stack = []
+    root = start = None
+    cuts = []
+    caret = text.find('<')
+    while caret != -1:
+        kind, end, name = markup_end(text, caret)
+        if end == -1:
+            return None
+        complete = kind in ['empty', 'node']
+        if kind == 'start':
+            if root is None:
+                root, start = name, end
+            stack.append(name)
+        elif kind == 'end' and stack:
+            if name == stack[-1]:
+                del stack[-1]
+                if not stack:
+                    return root, start, cuts, caret, end
+                complete = True
+            elif name in stack:
+                return None
+        if complete and len(stack) == 1:
+            if end - (cuts[-1] if cuts else start) >= size:
+                cuts.append(end)
+        caret = text.find('<', end)
+    return None
+
+
+def dump(node):
+    """Return a flat list of tuples `(level, kind, data, position,
+    extra)` describing the descendants of `node`. The position of an
+    element is its `pos` attribute, `None` for empty elements. """
+    records = []
+    stack = [(child, 0) for child in reversed(node.child)]
+    while stack:
+        crt, level = stack.pop()
+        kind = crt.__class__.__name__
+        if isinstance(crt, elements.Element):
+            records.append((level, kind, crt.name,
+                            getattr(crt, 'pos', None), crt.items()))
+            stack.extend([(child, level+1) for child in reversed(crt.child)])
+        elif isinstance(crt, elements.ProcessingInstruction):
+            records.append((level, kind, crt.data, crt.node_position,
+                            crt.target))
+        else:
+            records.append((level, kind, crt.data, crt.node_position,
+                            None))
+    return records
+
+
+def load(node, records):
+    """Append the nodes described by the `records` returned by `dump`
+    to `node`. """
+    parents = [node]
+    for level, kind, data, position, extra in records:
+        del parents[level+1:]
+        if kind == 'Element':
+            crt = elements.Element(data)
+            for key, val in extra:
+                crt[key] = val
+            if position is not None:
+                crt.pos = position
+        else:
+            if kind == 'ProcessingInstruction':
+                crt = elements.ProcessingInstruction(extra, data)
+            else:
+                crt = getattr(elements, kind)(data)
+            crt.set_position(*position)
+        parents[level].append_child_node(crt)
+        parents.append(crt)
+
+
+def init_worker(defaults):
+    """Create the parser of a worker process and return it. The node
+    parsers are loaded before the parser is stored in `PARSER` since
+    lexor may execute the modules of the style, this one included,
+    again while loading them. """
+    global PARSER  # pylint: disable=global-statement
+    parser = Parser('xml', 'default', defaults)
+    parser.load_node_parsers()
+    PARSER = parser
+    return parser
+
+
+def parse_piece(job):
+    """Parse a piece of a document in a worker process. Returns the
+    records of the nodes and the messages. """
+    text, origin, uri, defaults = job
+    parser = PARSER
+    if parser is None:
+        parser = init_worker(defaults)
+    parser.origin_ = origin
+    try:
+        parser.parse(text, uri)
+    finally:
+        parser.origin_ = None
+    messages = [
+        (msg['module'], msg['code'], msg['position'], msg['arg'])
+        for msg in parser.log.child
+    ]
+    return dump(parser.doc), messages
+
+
+def _jobs(text, bounds, uri, defaults):
+    """Generate the jobs for the workers. """
+    line, column = 1, 1
+    caret = 0
+    for start, end in bounds:
+        nlines = text.count('\n', caret, start)
+        line += nlines
+        if nlines > 0:
+            column = start - text.rfind('\n', caret, start)
+        else:
+            column += start - caret
+        caret = start
+        yield text[start:end], (line, column), uri, defaults
+
+
+def parse(parser, text, uri=None, processes=None, size=1 << 20):
+    """Parse `text` with `parser` using a pool of `processes`. Each
+    process parses pieces of about `size` characters. """
+    info = split(text, size, _markup_end(parser))
+    if info is None or not info[2]:
+        parser.parse(text, uri)
+        return
+    name, start, cuts, stop, end = info
+    if uri is None:
+        uri = 'string@0x%x' % id(text)
+    parser.parse('%s</%s>' % (text[:start], name), uri)
+    root = parser.doc.child[-1]
+    bounds = [
+        (first, last) for first, last in zip([start] + cuts, cuts + [stop])
+        if first < last
+    ]
+    targets = [root] * len(bounds)
+    if end < len(text):
+        bounds.append((end, len(text)))
+        targets.append(parser.doc)
+    pool = multiprocessing.Pool(processes, init_worker,
+                                (parser.defaults,))
+    try:
+        results = pool.imap(
+            parse_piece, _jobs(text, bounds, uri, parser.defaults)
+        )
+        for index, (records, messages) in enumerate(results):
+            load(targets[index], records)
+            for mod_name, code, pos, arg in messages:
+                parser.msg(mod_name, code, pos, arg, uri)
+    finally:
+        pool.close()
+        pool.join()
+    map_explanations(parser.log.modules, parser.log.explanation)
@@ -13,7 +13,6 @@ where `*` is a space character (this includes tabs and new lines).
 
 import re
 from lexor.core.parser import NodeParser
-from lexor.core.elements import ProcessingInstruction, Text
 
 RE = re.compile('.*?[ \t\n\r\f\v]')
 
@@ -28,24 +27,23 @@ class ProcessingInstructionNP(NodeParser):
         caret = parser.caret
         if parser.text[caret:caret+2] != '<?':
             return None
-        pos = parser.copy_pos()
         match = RE.search(parser.text, caret+1)
         if match:
             target = parser.text[parser.caret+1:match.end(0)-1]
         else:
-            self.msg('E100', pos)
+            parser.line_index.msg(self, 'E100', caret)
             content = parser.text[parser.caret:parser.end]
             parser.update(parser.end)
-            return Text(content)
-        index = parser.text.find('?>', match.end(0), parser.end)
+            return parser.nodes.Text(content)
+        index = parser.delimiters.find('?>', match.end(0))
         if index == -1:
-            self.msg('E101', pos, [target])
+            parser.line_index.msg(self, 'E101', caret, [target])
             content = parser.text[match.end(0):parser.end]
             parser.update(parser.end)
-            return ProcessingInstruction(target, content)
+            return parser.nodes.ProcessingInstruction(target, content)
         content = parser.text[match.end(0):index]
         parser.update(index+2)
-        return ProcessingInstruction(target, content)
+        return parser.nodes.ProcessingInstruction(target, content)
 
 
 MSG = {
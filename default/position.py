@@ -0,0 +1,105 @@
+"""XML: POSITION helper
+
+The node parsers in this style report their messages through the
+`LineIndex` object defined in this module. Instead of counting the
+new lines between the caret and the index of the message each time a
+position is needed, the offsets of all the new lines in the text are
+gathered once per document and the line and column of an index are
+found by a binary search.
+
+The index may be given the position of the first character of the
+text as its `origin`. This is used when the text is a piece of a
+larger document.
+
+When the index is created with `deferred=True` the messages are not
+sent to the parser right away. They are kept as offsets and are only
+turned into `[line, column]` positions when `flush` is called, which
+the style does once the document has been parsed. The messages sent
+by the parser itself in the meantime go through `send` and are queued
+along with them, so that the log keeps its order.
+
+When the index is created with `quiet=True` its `msg` method is
+replaced by `ignore` so that the messages, and the positions they
+need, are never computed.
+
+"""
+
+from bisect import bisect_left
+
+
+def ignore(*_):
+    """Discard a message. """
+    pass
+
+
+class LineIndex(object):
+    """Maps indices of the text being parsed to positions. """
+
+    def __init__(self, parser, deferred=False, origin=(1, 1),
+                 quiet=False):
+        self.parser = parser
+        self.deferred = deferred
+        self.origin = origin
+        self.lines = None
+        self.queue = []
+        if quiet:
+            self.msg = ignore
+
+    def build(self):
+        """Gather the offsets of the new lines in the text. This is
+        done automatically the first time a position is computed. """
+        text = self.parser.text
+        lines = [-1]
+        index = text.find('\n')
+        while index != -1:
+            lines.append(index)
+            index = text.find('\n', index+1)
+        self.lines = lines
+
+    def compute(self, index):
+        """Return the position `[line, column]` of `index`. Unlike
+        `Parser.compute`, `index` may be behind the caret. """
+        if self.lines is None:
+            self.build()
+        line = bisect_left(self.lines, index)
+        if line == 1:
+            return [self.origin[0], self.origin[1] + index]
+        return [self.origin[0] + line - 1, index - self.lines[line-1]]
+
+    def position(self, index):
+        """Return the position of `index`, avoiding the search if
+        `index` is the caret. """
+        parser = self.parser
+        if index == parser.caret:
+            return parser.copy_pos()
+        return self.compute(index)
+
+    def msg(self, nparser, code, index, arg=None):
+        """Send a message from the node parser `nparser` located at
+        `index`. When `arg` is an integer it is taken to be the index
+        of a position and it gets replaced by that position. """
+        if self.deferred:
+            self.queue.append((nparser, (code, index, arg)))
+            return
+        if isinstance(arg, int):
+            arg = self.compute(arg)
+        nparser.msg(code, self.position(index), arg)
+
+    def send(self, *args):
+        """Queue a message of the parser. Stands in for the `msg`
+        method of the parser while the messages are deferred. """
+        self.queue.append((None, args))
+
+    def flush(self):
+        """Send the deferred messages to the parser. This must be
+        done once `send` no longer stands in for its `msg` method. """
+        queue = self.queue
+        self.queue = []
+        for nparser, args in queue:
+            if nparser is None:
+                self.parser.msg(*args)
+                continue
+            code, index, arg = args
+            if isinstance(arg, int):
+                arg = self.compute(arg)
+            nparser.msg(code, self.compute(index), arg)
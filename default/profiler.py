@@ -0,0 +1,102 @@
+"""XML: PROFILER helper
+
+With the `profile` option the style wraps the `make_node` method of
+each of the node parsers in its `REPOSITORY` during a parse to find
+out where the time goes:
+
+    parser = Parser('xml', 'default', {'profile': 'true'})
+    parser.parse(text)
+    parser.profile.report()
+
+The report is a dictionary keyed by the name of the node parser
+class. For each node parser it gives the number of calls to
+`make_node`, how many of them made a node (`accepted`) and how many
+returned `None` (`declined`), the time spent in those calls, the
+number of characters consumed and the number of messages sent with
+each code. The messages sent by the lexor parser itself are found
+under `Parser`.
+
+The methods are restored once the parse is done, or when the next
+parse starts if the parse raised an exception. Without the option
+`parser.profile` is `None` and the node parsers are not touched.
+
+"""
+
+import time
+from lexor.core.parser import Parser
+
+
+class Profiler(object):
+    """Collects the statistics of the node parsers of `parser`
+    during a parse. """
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.stats = dict()
+        self.modules = {Parser.__module__: 'Parser'}
+        self._methods = []
+
+    def start(self):
+        """Wrap the `make_node` method of the node parsers. """
+        parser = self.parser
+        for cls in parser.style_module.REPOSITORY:
+            name = cls.__name__
+            nparser = parser[name]
+            self.stats[name] = {
+                'calls': 0,
+                'accepted': 0,
+                'declined': 0,
+                'seconds': 0.0,
+                'bytes': 0,
+                'messages': dict(),
+            }
+            self.modules[nparser.__module__] = name
+            self._methods.append(
+                (nparser, nparser.__dict__.get('make_node'))
+            )
+            nparser.make_node = self._wrap(name, nparser.make_node)
+
+    def _wrap(self, name, method):
+        """Return a function measuring the calls to `method`. """
+        parser = self.parser
+        stats = self.stats[name]
+        clock = time.time
+
+        def make_node():
+            """Measured `make_node`. """
+            caret = parser.caret
+            start = clock()
+            node = method()
+            stats['seconds'] += clock() - start
+            stats['calls'] += 1
+            if node is None:
+                stats['declined'] += 1
+            else:
+                stats['accepted'] += 1
+                stats['bytes'] += parser.caret - caret
+            return node
+        return make_node
+
+    def restore(self):
+        """Restore the `make_node` methods wrapped by `start`. """
+        for nparser, method in self._methods:
+            if method is None:
+                del nparser.make_node
+            else:
+                nparser.make_node = method
+        self._methods = []
+
+    def stop(self):
+        """Restore the node parsers and count the messages in the
+        log of the parser. """
+        self.restore()
+        for msg in self.parser.log.child:
+            name = self.modules.get(msg['module'], msg['module'])
+            if name not in self.stats:
+                self.stats[name] = {'messages': dict()}
+            messages = self.stats[name]['messages']
+            messages[msg['code']] = messages.get(msg['code'], 0) + 1
+
+    def report(self):
+        """Return the statistics collected during the parse. """
+        return self.stats
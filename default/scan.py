@@ -0,0 +1,388 @@
+"""XML: SCAN helper
+
+The `Scanner` defined in this module walks over the markup of a text
+without creating any nodes. It follows the same rules as the node
+parsers to decide where a comment, CDATA section, processing
+instruction, document type or tag ends and keeps track of the
+elements that are open. This is enough to find the places in the text
+where a node at a given depth has been completed.
+
+The scanner is resumable: when the text ends in the middle of a
+construct the caret is left at the beginning of the construct so that
+the scan may continue once more text is appended.
+
+The node parsers look for the delimiters of the markup, such as `>`,
+`]]>`, `--` and `?>`, through the `parser.delimiters` object. The
+`Delimiters` class remembers the last index found for each delimiter
+so that the text is not searched again when the answer is known.
+Without it, a text with many `<` and no `>` would be searched up to
+its end for every `<`. With the `numpy_scan` option and NumPy
+installed, `ArrayDelimiters` is used instead: the indices of all the
+characters which may start a delimiter are gathered in one vectorized
+pass over the text, each delimiter is looked up among those
+candidates the first time it is needed, and every search becomes a
+binary search. NumPy is only imported when `ArrayDelimiters` is first
+used since importing it takes longer than most parses.
+
+"""
+
+import re
+from bisect import bisect_left
+
+RE = re.compile(r'.*?[ \t\n\r\f\v/>]')
+RE_PI = re.compile('.*?[ \t\n\r\f\v]')
+RE_NOSPACE = re.compile(r'\s*')
+RE_NEXT = re.compile(r'.*?[ \t\n\r\f\v/>=]')
+# NumPy, once `load_numpy` has been called. `False` if it is missing.
+numpy = None  # pylint: disable=invalid-name
+
+
+def load_numpy():
+    """Import NumPy if needed. Returns `True` if it is available. """
+    global numpy  # pylint: disable=global-statement,invalid-name
+    if numpy is None:
+        try:
+            import numpy as module
+        except ImportError:
+            module = False
+        numpy = module
+    return numpy is not False
+
+
+def is_empty(text, index, end):
+    """Return True if the node parsers take the opening tag with the
+    attributes in
+
+        text[index:end]
+
+    to be the tag of an empty element. This follows the way
+    `ElementNP.read_attributes` reads the attributes: a `/` makes the
+    element empty where an attribute name may start or end, but not
+    where a value may start. """
+    while index < end:
+        index = RE_NOSPACE.match(text, index, end).end()
+        if text[index] == '/':
+            return True
+        match = RE_NEXT.search(text, index, end)
+        if match is None:
+            return False
+        char = text[match.end()-1]
+        if char == '/':
+            return True
+        index = match.end()
+        if char != '=':
+            index = RE_NOSPACE.match(text, index, end).end()
+            if text[index] != '=':
+                continue
+            index += 1
+        index = RE_NOSPACE.match(text, index, end).end()
+        char = text[index]
+        if index == end or char == '/':
+            return False
+        if char in ['"', "'"]:
+            index = text.find(char, index+1, end)
+            if index == -1:
+                return False
+            index += 1
+            continue
+        match = RE.search(text, index, end)
+        if match is None:
+            return False
+        index = match.end() - 1
+    return False
+
+
+def markup_end(text, caret, find=None):
+    """Return a tuple `(kind, end, name)` describing the markup that
+    starts with the `<` at `caret`. `kind` is one of
+
+    - `'start'`: opening tag of the element `name`.
+    - `'empty'`: empty element `name`.
+    - `'end'`: closing tag with `name` as its content.
+    - `'node'`: comment, CDATA, processing instruction or doctype.
+    - `'text'`: a stray `<`.
+
+    `end` is the index after the markup or `-1` if `text` ends
+    before the markup is complete. The searches are made with `find`,
+    which defaults to `text.find`. """
+    if find is None:
+        find = text.find
+    char = text[caret+1:caret+2]
+    if char == '':
+        return 'text', -1, None
+    if char.isalpha() or char in [":", "_"]:
+        endindex = find('>', caret+1)
+        if endindex == -1:
+            if find('<', caret+1) != -1:
+                return 'text', caret+1, None
+            return 'start', -1, None
+        if find('<', caret+1, endindex) != -1:
+            return 'text', caret+1, None
+        match = RE.search(text, caret+1)
+        name = text[caret+1:match.end(0)-1]
+        if is_empty(text, match.end(0)-1, endindex):
+            return 'empty', endindex+1, name
+        return 'start', endindex+1, name
+    if char == '/':
+        index = find('>', caret+2)
+        if index == -1:
+            return 'end', -1, None
+        return 'end', index+1, text[caret+2:index]
+    if char == '?':
+        match = RE_PI.search(text, caret+1)
+        if match is None:
+            return 'node', -1, None
+        index = find('?>', match.end(0))
+        return 'node', -1 if index == -1 else index+2, None
+    if char != '!':
+        return 'text', caret+1, None
+    if text[caret+2:caret+4] == '--':
+        index = find('-->', caret+4)
+        return 'node', -1 if index == -1 else index+3, None
+    if '<![CDATA['.startswith(text[caret:caret+9]):
+        if len(text) - caret < 9:
+            return 'node', -1, None
+        index = find(']]>', caret+9)
+        return 'node', -1 if index == -1 else index+3, None
+    index = find('>', caret+2)
+    return 'node', -1 if index == -1 else index+1, None
+
+
+class Delimiters(object):
+    """Searches the text of a parser for the delimiters of the
+    markup, remembering the last result for each of them. """
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.memo = dict()
+
+    def find(self, sub, start, end=None):
+        """Return the lowest index of `sub` in the text of the parser
+        at or after `start` such that `sub` is contained in
+        `text[start:end]`, or `-1` if there is none. """
+        first, index = self.memo.get(sub, (-1, -2))
+        if first > start or (index < start and index != -1):
+            index = self.parser.text.find(sub, start)
+            self.memo[sub] = (start, index)
+        if end is not None and index + len(sub) > end:
+            return -1
+        return index
+
+
+# Characters which start the delimiters.
+CANDIDATES = '<>&"\'-]?'
+
+
+class ArrayDelimiters(object):
+    """Finds the delimiters of the markup among the indices of the
+    `CANDIDATES` in the text of a parser. Requires NumPy. """
+
+    def __init__(self, parser):
+        load_numpy()
+        self.parser = parser
+        self.codes = None
+        self.candidates = None
+        self.positions = dict()
+
+    def _scan(self):
+        """Gather the indices of the candidates in one pass. """
+        text = self.parser.text
+        if isinstance(text, bytes) or not hasattr(text, 'encode'):
+            codes = numpy.frombuffer(text, numpy.uint8)
+        else:
+            codes = numpy.frombuffer(text.encode('utf-32-le'), '<u4')
+        wanted = numpy.array([ord(char) for char in CANDIDATES])
+        self.codes = codes
+        self.candidates = numpy.flatnonzero(numpy.isin(codes, wanted))
+
+    def _positions(self, sub):
+        """Return the sorted list of the indices of `sub`. """
+        if self.candidates is None:
+            self._scan()
+        codes = self.codes
+        sub = [char if isinstance(char, int) else ord(char) for char in sub]
+        found = self.candidates[codes[self.candidates] == sub[0]]
+        found = found[found + len(sub) <= len(codes)]
+        for num in range(1, len(sub)):
+            found = found[codes[found + num] == sub[num]]
+        return found.tolist()
+
+    def find(self, sub, start, end=None):
+        """Same as `Delimiters.find`. """
+        try:
+            positions = self.positions[sub]
+        except KeyError:
+            positions = self.positions[sub] = self._positions(sub)
+        num = bisect_left(positions, start)
+        if num == len(positions):
+            return -1
+        index = positions[num]
+        if end is not None and index + len(sub) > end:
+            return -1
+        return index
+
+
+class Finder(object):
+    """Searches a text which may grow, remembering the last result
+    for each string. A search which failed is resumed where it
+    stopped once more text is appended. """
+
+    def __init__(self, text=''):
+        self.text = text
+        self.memo = dict()
+
+    def shift(self, index):
+        """Drop the text before `index`. """
+        self.text = self.text[index:]
+        memo = dict()
+        for sub, (first, found, size) in self.memo.items():
+            if found != -1 and found < index:
+                continue
+            memo[sub] = (
+                max(first - index, 0),
+                -1 if found == -1 else found - index,
+                size - index,
+            )
+        self.memo = memo
+
+    def find(self, sub, start, end=None):
+        """Same as `str.find` with an optional `end`. """
+        text = self.text
+        first, found, size = self.memo.get(sub, (-1, -2, 0))
+        if first == -1 or first > start or (found < start and found != -1):
+            found = text.find(sub, start)
+            self.memo[sub] = (start, found, len(text))
+        elif found == -1 and size < len(text):
+            resume = size - len(sub) + 1
+            if start > resume:
+                first = resume = start
+            found = text.find(sub, resume)
+            self.memo[sub] = (first, found, len(text))
+        if end is not None and found + len(sub) > end:
+            return -1
+        return found
+
+
+class Scanner(object):
+    """Keeps track of the elements opened in a text up to `caret`.
+    The text may be given in pieces with `append`. The text before
+    the caret has been scanned and is kept in a list of chunks, which
+    are joined once, when they are taken with `take`. While the
+    markup at the caret is incomplete, the pieces which cannot
+    complete it are kept in the `pending` list instead of being
+    joined to the text. """
+
+    def __init__(self, text=''):
+        self.chunks = []
+        self.offset = 0
+        self.text = text
+        self.pending = []
+        self.npending = 0
+        self.waiting = None
+        self.tail = text[:0]
+        self.caret = 0
+        self.stack = []
+        self.finder = Finder(text)
+
+    def __len__(self):
+        return self.offset + len(self.text) + self.npending
+
+    def _shift(self, index):
+        """Drop the first `index` characters of `text`. """
+        self.finder.shift(index)
+        self.text = self.finder.text
+        self.caret -= index
+
+    def _waiting(self):
+        """Return the delimiters which were searched for and not
+        found after the caret, `None` if the markup at the caret could
+        be completed by any text. """
+        text = self.text
+        caret = self.caret
+        if len(text) - caret < 9 or text[caret+1:caret+2] == '?':
+            return None
+        waiting = [
+            sub for sub, item in self.finder.memo.items() if item[1] == -1
+        ]
+        self.tail = text[-2:]
+        return waiting or None
+
+    def _join(self, text):
+        """Move the scanned text into the chunks and join the pending
+        pieces and `text` to the rest. """
+        if self.caret:
+            self.chunks.append(self.text[:self.caret])
+            self.offset += self.caret
+            self._shift(self.caret)
+        self.pending.append(text)
+        self.text = self.text[:0].join([self.text] + self.pending)
+        self.finder.text = self.text
+        self.pending = []
+        self.npending = 0
+        self.waiting = None
+
+    def append(self, text):
+        """Add more text to scan. """
+        if self.waiting is not None:
+            probe = self.tail + text
+            if not [sub for sub in self.waiting if sub in probe]:
+                self.pending.append(text)
+                self.npending += len(text)
+                self.tail = probe[-2:]
+                return
+        self._join(text)
+
+    def take(self, index):
+        """Return the text up to `index`, a boundary returned by
+        `next_boundary` or the length of the scanner, and drop it. """
+        if self.pending:
+            self._join(self.text[:0])
+        index -= self.offset
+        chunks = self.chunks + [self.text[:index]]
+        self.chunks = []
+        self.offset = 0
+        self._shift(index)
+        return self.text[:0].join(chunks)
+
+    def close(self, name):
+        """Close the element `name` and any elements opened after it.
+        Nothing is closed if `name` is not open. """
+        stack = self.stack
+        num = len(stack) - 1
+        while num > -1:
+            if stack[num] == name:
+                del stack[num:]
+                return
+            num -= 1
+
+    def next_boundary(self, depth=0):
+        """Move the caret forward until a node at the given `depth`
+        is completed and return the index after the node. Returns
+        `-1` if the text runs out first. """
+        if self.pending:
+            return -1
+        text = self.text
+        find = self.finder.find
+        stack = self.stack
+        while True:
+            caret = find('<', self.caret)
+            if caret == -1:
+                self.caret = len(text)
+                return -1
+            kind, end, name = markup_end(text, caret, find)
+            if end == -1:
+                self.caret = caret
+                self.waiting = self._waiting()
+                return -1
+            self.caret = end
+            if kind == 'start':
+                stack.append(name)
+                continue
+            if kind == 'end':
+                if name not in stack:
+                    continue
+                self.close(name)
+            elif kind == 'text':
+                continue
+            if len(stack) == depth:
+                return self.offset + end
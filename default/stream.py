@@ -0,0 +1,113 @@
+"""XML: STREAM helper
+
+Parses a document that arrives in pieces, be it a file object or an
+iterable of strings. The text is fed to a `Scanner` which tells where
+the top-level nodes of the document end. Each time a top-level node
+is completed, the text up to the end of the node is parsed on its own
+and the nodes are handed back to the caller. Unterminated comments,
+CDATA sections, processing instructions and tags are kept until the
+rest of their text arrives.
+
+The positions of the nodes and messages are the same as the ones
+obtained by parsing the whole document at once. Only the text of the
+node being completed is kept in memory, as a list of the chunks
+received, which are joined once the node is complete. Note that if
+the document has a single root element then the whole document is
+one top-level node.
+
+    stream = StreamParser(Parser('xml', 'default'), 'file.xml')
+    for node in stream.iterparse(open('file.xml')):
+        ...
+    stream.log
+
+"""
+
+from lexor.core.elements import Document
+
+
+def read_chunks(fileobj, size):
+    """Yield the contents of `fileobj` in chunks of `size`. """
+    while True:
+        chunk = fileobj.read(size)
+        if not chunk:
+            break
+        yield chunk
+
+
+class StreamParser(object):
+    """Feeds the pieces of a document to a lexor `Parser` set to
+    parse xml in the default style. """
+
+    def __init__(self, parser, uri=None):
+        self.parser = parser
+        self.uri = uri
+        if uri is None:
+            self.uri = 'stream@0x%x' % id(self)
+        self.scanner = self.make_scanner()
+        self.origin = (1, 1)
+        self.log = Document("lexor", "log")
+        self.log.modules = dict()
+        self.log.explanation = dict()
+
+    def make_scanner(self):
+        """Return a new `Scanner` from the style. """
+        style = self.parser.style_module
+        if style is None:
+            self.parser.load_node_parsers()
+            style = self.parser.style_module
+        return style.MOD['scan'].Scanner()
+
+    def feed(self, chunk):
+        """Add `chunk` to the text and return a list of the top-level
+        nodes completed by it. """
+        scanner = self.scanner
+        scanner.append(chunk)
+        nodes = []
+        index = scanner.next_boundary()
+        while index != -1:
+            nodes.extend(self.parse(index))
+            index = scanner.next_boundary()
+        return nodes
+
+    def close(self):
+        """Parse the remaining text and return its nodes. """
+        if not len(self.scanner):
+            return []
+        return self.parse(len(self.scanner))
+
+    def iterparse(self, source, size=65536):
+        """Yield the top-level nodes of `source`, a file object or an
+        iterable of strings. """
+        if hasattr(source, 'read'):
+            source = read_chunks(source, size)
+        for chunk in source:
+            for node in self.feed(chunk):
+                yield node
+        for node in self.close():
+            yield node
+
+    def parse(self, index):
+        """Parse the scanned text up to `index`, drop it from the
+        scanner and return the nodes. """
+        parser = self.parser
+        text = self.scanner.take(index)
+        parser.origin_ = self.origin
+        try:
+            parser.parse(text, self.uri)
+        finally:
+            parser.origin_ = None
+        nlines = text.count('\n')
+        if nlines:
+            self.origin = (
+                self.origin[0] + nlines, len(text) - text.rfind('\n')
+            )
+        else:
+            self.origin = (self.origin[0], self.origin[1] + len(text))
+        self.update_log(parser.log)
+        return list(parser.doc.child)
+
+    def update_log(self, log):
+        """Move the messages from `log` into the stream log. """
+        self.log.modules.update(log.modules)
+        self.log.explanation.update(log.explanation)
+        self.log.extend_children(log)
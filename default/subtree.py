@@ -0,0 +1,212 @@
+"""XML: SUBTREE helper
+
+Most jobs only need a few of the elements of a document. The `parse`
+function defined in this module goes over the markup of the document
+keeping only the names of the open elements and hands to the parser
+the text of the elements that match a filter. No other node is
+created and the text in between the matching elements is only
+scanned for markup. Comments, CDATA sections and processing
+instructions are skipped as a whole, so the tags inside them are not
+taken into account.
+
+    parse(parser, text, 'item/price', 'catalog.xml')
+    for price in parser.doc:
+        ...
+
+The filter is a list of paths separated by commas. A path is a list
+of element names separated by `/` and matches the elements with the
+last name in the path whose closest ancestors have the rest of the
+names. A path starting with `/` has to list all the ancestors of the
+element. The name `*` matches any element. An element which matches
+the filter is parsed along with all its descendants.
+
+The positions of the nodes and messages are the ones they have in the
+whole document. The messages are the ones obtained by parsing each
+element on its own. For instance, a matching element closed by the
+closing tag of one of its ancestors is reported as not closed.
+
+To find where an element ends only the tags with its name or the name
+of one of its ancestors are looked at, along with the comments, CDATA
+sections, processing instructions and document types which may hide
+them. When all the paths start with `/` the elements which cannot
+contain a match are skipped the same way, without looking at the tags
+inside them. In a document where an element is closed by the closing
+tag of an element of another name inside it, the end of the element
+may then be placed further than the parser would place it.
+
+"""
+
+import re
+from lexor.core import elements
+
+# Expressions finding the tags that matter to `_element_end`, keyed by
+# the names of the open elements.
+PATTERNS = dict()
+MAX_PATTERNS = 256
+
+
+class Filter(object):
+    """Decides if an element matches the paths in `spec`. """
+
+    def __init__(self, spec):
+        self.paths = []
+        self.names = set()
+        for path in spec.split(','):
+            path = path.strip()
+            if not path:
+                continue
+            steps = path.strip('/').split('/')
+            self.paths.append((path.startswith('/'), steps))
+            self.names.add(steps[-1])
+
+    def __call__(self, stack):
+        """Return `True` if the last element in `stack`, a list of
+        the names of the open elements, matches one of the paths. """
+        if stack[-1] not in self.names and '*' not in self.names:
+            return False
+        for anchored, steps in self.paths:
+            num = len(steps)
+            if num > len(stack) or (anchored and num != len(stack)):
+                continue
+            for step, name in zip(steps, stack[-num:]):
+                if step != '*' and step != name:
+                    break
+            else:
+                return True
+        return False
+
+    def descend(self, stack):
+        """Return `True` if the descendants of the last element in
+        `stack` may match one of the paths. """
+        depth = len(stack)
+        for anchored, steps in self.paths:
+            if not anchored:
+                return True
+            if len(steps) <= depth:
+                continue
+            for step, name in zip(steps, stack):
+                if step != '*' and step != name:
+                    break
+            else:
+                return True
+        return False
+
+
+def _pattern(stack):
+    """Return a compiled expression finding the tags with the names
+    in `stack` and the markup which may hide them. """
+    key = frozenset(stack)
+    try:
+        return PATTERNS[key]
+    except KeyError:
+        if len(PATTERNS) >= MAX_PATTERNS:
+            PATTERNS.clear()
+        names = '|'.join([re.escape(name) for name in sorted(key)])
+        pattern = PATTERNS[key] = re.compile(
+            '<(?:[!?]|/?(?:%s)[ \t\n\r\f\v/>])' % names
+        )
+        return pattern
+
+
+def _innermost(stack, name):
+    """Return the index of the last `name` in `stack` or `-1`. """
+    index = len(stack) - 1
+    while index >= 0 and stack[index] != name:
+        index -= 1
+    return index
+
+
+def _element_end(text, caret, stack, markup_end):
+    """Return a tuple `(stop, caret)` where `stop` is the index where
+    the last element of `stack` ends and `caret` is where the scan
+    has to continue. The scan starts at `caret`, after the opening
+    tag of the element, and only stops at the tags named like the
+    elements in `stack`. """
+    level = len(stack) - 1
+    search = _pattern(stack).search
+    match = search(text, caret)
+    while match is not None:
+        caret = match.start()
+        kind, end, name = markup_end(text, caret)
+        if end == -1:
+            break
+        if kind == 'start':
+            stack.append(name)
+        elif kind == 'end':
+            index = _innermost(stack, name)
+            if index == level:
+                del stack[level:]
+                return end, end
+            if index > level:
+                del stack[index:]
+            elif index != -1:
+                del stack[level:]
+                return caret, caret
+        match = search(text, end)
+    del stack[level:]
+    return len(text), len(text)
+
+
+def find(text, match, markup_end):
+    """Yield the tuples `(start, stop)` such that `text[start:stop]`
+    is an element for which `match` returns `True`. """
+    stack = []
+    caret = text.find('<')
+    while caret != -1:
+        kind, end, name = markup_end(text, caret)
+        if end == -1:
+            return
+        if kind in ['start', 'empty']:
+            stack.append(name)
+            matched = match(stack)
+            if kind == 'empty':
+                del stack[-1]
+                if matched:
+                    yield caret, end
+            elif matched:
+                stop, end = _element_end(text, end, stack, markup_end)
+                yield caret, stop
+            elif not match.descend(stack):
+                end = _element_end(text, end, stack, markup_end)[1]
+        elif kind == 'end':
+            index = _innermost(stack, name)
+            if index != -1:
+                del stack[index:]
+        caret = text.find('<', end)
+
+
+def parse(parser, text, spec, uri=None):
+    """Parse the elements of `text` matching the filter `spec` with
+    `parser`. The elements are placed in `parser.doc` and their
+    messages in `parser.log`. """
+    if parser.style_module is None:
+        parser.load_node_parsers()
+    markup_end = parser.style_module.MOD['scan'].markup_end
+    if uri is None:
+        uri = 'string@0x%x' % id(text)
+    doc = elements.Document('xml')
+    doc.uri_ = uri
+    log = elements.Document("lexor", "log")
+    log.modules = dict()
+    log.explanation = dict()
+    line, column = 1, 1
+    caret = 0
+    for start, stop in find(text, Filter(spec), markup_end):
+        nlines = text.count('\n', caret, start)
+        line += nlines
+        if nlines > 0:
+            column = start - text.rfind('\n', caret, start)
+        else:
+            column += start - caret
+        caret = start
+        parser.origin_ = (line, column)
+        try:
+            parser.parse(text[start:stop], uri)
+        finally:
+            parser.origin_ = None
+        log.modules.update(parser.log.modules)
+        log.explanation.update(parser.log.explanation)
+        log.extend_children(parser.log)
+        doc.extend_children(parser.doc)
+    parser.doc = doc
+    parser.log = log
@@ -0,0 +1,45 @@
+"""XML: DEFAULT parser BATCH test
+
+Testing suite to check the results of the batch script.
+
+"""
+
+import os
+import imp
+import shutil
+import tempfile
+from nose.tools import eq_
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BATCH = imp.load_source('batch', os.path.join(ROOT, 'batch.py'))
+
+
+def test_batch():
+    """xml.parser.default.batch: results of each file """
+    directory = tempfile.mkdtemp()
+    try:
+        for name, text in [('good.xml', '<a x="1"><b/></a>'),
+                           ('bad.xml', '<a><b x=1>&</a>'),
+                           ('skip.txt', '<a>')]:
+            with open(os.path.join(directory, name), 'w') as tmpf:
+                tmpf.write(text)
+        os.symlink(os.path.join(directory, 'gone'),
+                   os.path.join(directory, 'gone.xml'))
+        files = BATCH.collect([directory])
+        eq_([os.path.basename(path) for path in files],
+            ['bad.xml', 'gone.xml', 'good.xml'])
+        results = dict([
+            (os.path.basename(item['path']), item)
+            for item in BATCH.run(files, {}, processes=1)
+        ])
+        eq_(results['good.xml']['messages'], 0)
+        eq_(results['bad.xml']['codes'], {
+            'element:E131': 1, 'entity:E100': 1, 'parser:W100': 1,
+        })
+        eq_('error' in results['gone.xml'], True)
+        eq_('codes' in results['gone.xml'], False)
+        summary = BATCH.summarize(list(results.values()), 0)
+        eq_((summary['files'], summary['failed'], summary['messages']),
+            (3, 1, 3))
+    finally:
+        shutil.rmtree(directory)
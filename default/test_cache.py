@@ -0,0 +1,85 @@
+"""XML: DEFAULT parser CACHE test
+
+Testing suite to check the cache of parsed documents.
+
+"""
+
+import shutil
+import tempfile
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from lexor.command.lang import get_style_module
+from lexor.command.test import equal_nodes
+
+MOD = get_style_module('parser', 'xml', 'default').MOD
+TEXT = '<a x="1">\n  <b>&amp;</b><c>\n</a>'
+
+
+def _messages(parser):
+    """Return the codes and positions of the messages. """
+    return [(msg['code'], list(msg['position']))
+            for msg in parser.log.child]
+
+
+def test_cache():
+    """xml.parser.default.cache: hits and evictions """
+    cache = MOD['cache'].ParseCache(maxsize=2)
+    plain = Parser('xml', 'default')
+    plain.parse(TEXT)
+    parser = Parser('xml', 'default')
+    cache.parse(parser, TEXT)
+    cache.parse(parser, TEXT)
+    eq_(equal_nodes(parser.doc, plain.doc), True)
+    eq_(parser.doc[0].items(), [('x', '1')])
+    eq_(_messages(parser), _messages(plain))
+    cache.parse(parser, '<b/>')
+    cache.parse(parser, '<c/>')
+    stats = cache.stats()
+    eq_((stats['hits'], stats['misses'], stats['evictions']), (1, 3, 1))
+    other = Parser('xml', 'default', {'decode_entities': 'true'})
+    cache.parse(other, '<c/>')
+    eq_(cache.stats()['misses'], 4)
+
+
+def test_disk():
+    """xml.parser.default.cache: disk store """
+    directory = tempfile.mkdtemp()
+    try:
+        parser = Parser('xml', 'default')
+        MOD['cache'].ParseCache(directory=directory).parse(parser, TEXT)
+        cache = MOD['cache'].ParseCache(directory=directory)
+        cache.parse(parser, TEXT)
+        eq_(cache.stats()['disk_hits'], 1)
+        eq_(cache.stats()['misses'], 0)
+        eq_(parser.doc[0][1].name, 'b')
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_maxbytes():
+    """xml.parser.default.cache: size of the entries """
+    parser = Parser('xml', 'default')
+    cache = MOD['cache'].ParseCache()
+    cache.parse(parser, '<b>caf\xc3\xa9</b>')
+    size = cache.stats()['bytes']
+    cache = MOD['cache'].ParseCache(maxbytes=size)
+    cache.parse(parser, '<b>caf\xc3\xa9</b>')
+    cache.parse(parser, '<b>caf\xc3\xa9</b>')
+    eq_(cache.stats()['hits'], 1)
+    cache.parse(parser, '<c>caf\xc3\xa9</c>')
+    eq_(cache.stats()['evictions'], 1)
+    eq_(parser.doc[0][0].data, 'caf\xc3\xa9')
+
+
+def test_positions():
+    """xml.parser.default.cache: element positions after a hit """
+    plain = Parser('xml', 'default')
+    plain.parse(TEXT)
+    parser = Parser('xml', 'default')
+    cache = MOD['cache'].ParseCache()
+    cache.parse(parser, TEXT)
+    cache.parse(parser, TEXT)
+    eq_(cache.stats()['hits'], 1)
+    eq_([node.pos for node in parser.doc[0] if node.name != '#text'],
+        [node.pos for node in plain.doc[0] if node.name != '#text'])
+    eq_(parser.doc[0].pos, plain.doc[0].pos)
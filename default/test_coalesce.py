@@ -0,0 +1,47 @@
+"""XML: DEFAULT parser COALESCE test
+
+Testing suite to check the joining of text nodes.
+
+"""
+
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from lexor.core import elements
+from lexor.command.lang import get_style_module
+
+MOD = get_style_module('parser', 'xml', 'default').MOD
+TEXT = '<a>\n  <b>x &amp; y</b>\n  <c/>\n</a>\n'
+
+
+def _children(node):
+    """Return the names and data of the children of `node`. """
+    return [(child.name, getattr(child, 'data', None))
+            for child in node.child]
+
+
+def test_coalesce():
+    """xml.parser.default.coalesce: join text nodes """
+    node = elements.Element('a')
+    for data in ['x', '', 'y', 'z']:
+        node.append_child(elements.Text(data))
+    node.append_child(elements.Element('b'))
+    node.append_child(elements.Text(''))
+    node.append_child(elements.Text(' '))
+    eq_(MOD['coalesce'].coalesce(node), 4)
+    eq_(_children(node), [('#text', 'xyz'), ('b', None), ('#text', ' ')])
+    eq_(node[1].prev is node[0] and node[1].next is node[2], True)
+    eq_([child.index for child in node.child], [0, 1, 2])
+
+
+def test_strip():
+    """xml.parser.default.coalesce: strip_whitespace """
+    parser = Parser('xml', 'default', {'strip_whitespace': 'true'})
+    parser.parse(TEXT)
+    eq_(len(parser.doc), 1)
+    eq_([child.name for child in parser.doc[0]], ['b', 'c'])
+    eq_(len(parser.doc[0][0]), 3)
+    events = MOD['events'].EventParser({'strip_whitespace': 'true'})
+    eq_([event for event, _ in events.iterparse(TEXT)], [
+        'start', 'start', 'text', 'entity', 'text', 'end',
+        'start', 'end', 'end',
+    ])
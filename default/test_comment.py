@@ -4,11 +4,25 @@ Testing suite to parse xml comment in the default style.
 
 """
 
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from lexor.command.lang import get_style_module
 from lexor.command.test import nose_msg_explanations
 
+MOD = get_style_module('parser', 'xml', 'default').MOD
+
 
 def test_comment():
     """xml.parser.default.comment: MSG_EXPLANATION """
     nose_msg_explanations(
         'xml', 'parser', 'default', 'comment'
     )
+
+
+def test_many_hyphens():
+    """xml.parser.default.comment: batched E301 """
+    parser = Parser('xml', 'default')
+    parser.parse('<!--%s-->' % ('a-- ' * 100))
+    codes = [msg['code'] for msg in parser.log.child]
+    eq_(codes, ['E301'] * MOD['comment'].MAX_E301 + ['E302'])
+    eq_(parser.doc[0].data, 'a-  ' * 100)
@@ -0,0 +1,91 @@
+"""XML: DEFAULT parser COMPACT test
+
+Testing suite to check the trees stored in parallel arrays.
+
+"""
+
+import os
+import tempfile
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from lexor.command.lang import get_style_module
+from lexor.command.test import equal_nodes
+
+MOD = get_style_module('parser', 'xml', 'default').MOD
+TEXT = """<?xml version="1.0"?>
+<!DOCTYPE doc>
+<doc a="1" b="2">
+  <!-- note --><item id="x">one &amp; two</item><item id="y"/>
+  <![CDATA[ <raw> ]]> a < b </c>
+</doc>
+"""
+
+
+def test_compact():
+    """xml.parser.default.compact: same document """
+    parser = Parser('xml', 'default')
+    parser.parse(TEXT)
+    events = MOD['events'].EventParser()
+    tree = MOD['compact'].CompactTree.from_events(events, TEXT)
+    doc = tree.materialize(0)
+    eq_(str(doc), str(parser.doc))
+    eq_([getattr(node, 'pos', None) for node in doc[-2]],
+        [getattr(node, 'pos', None) for node in parser.doc[-2]])
+    root = tree.view().child[-2]
+    eq_(root.name, 'doc')
+    eq_(root.items(), [('a', '1'), ('b', '2')])
+    eq_(root.node_position, (3, 1))
+    items = [node for node in root.child if node.name == 'item']
+    eq_([node['id'] for node in items], ['x', 'y'])
+    eq_(items[0].node.name, 'item')
+    eq_(tree.strings.count('item'), 1)
+
+
+def test_save_load():
+    """xml.parser.default.compact: save and load """
+    parser = Parser('xml', 'default')
+    parser.parse(TEXT)
+    compact = MOD['compact']
+    tree = compact.CompactTree.from_node(parser.doc, parser.log)
+    eq_(str(tree.materialize(0)), str(parser.doc))
+    handle, path = tempfile.mkstemp(suffix='.lxt')
+    os.close(handle)
+    try:
+        tree.save(path)
+        loaded = compact.CompactTree.load(path)
+        eq_(len(loaded), len(tree))
+        eq_(str(loaded.materialize(0)), str(parser.doc))
+        root = loaded.view().child[-2]
+        eq_(root.name, 'doc')
+        eq_(root.items(), [('a', '1'), ('b', '2')])
+        eq_(root.node_position, (3, 1))
+        eq_(loaded.materialize(0).child[-2].pos, parser.doc.child[-2].pos)
+        eq_([tuple(msg[:3]) for msg in loaded.messages],
+            [(msg['module'], msg['code'], list(msg['position']))
+             for msg in parser.log.child])
+        loaded.close()
+    finally:
+        os.remove(path)
+
+
+def test_load_bytes():
+    """xml.parser.default.compact: mapped arrays and strings """
+    parser = Parser('xml', 'default')
+    parser.parse('<r caf\xc3\xa9="\xc3\xa9t\xc3\xa9">x<c/></r>')
+    compact = MOD['compact']
+    tree = compact.CompactTree.from_node(parser.doc, parser.log)
+    handle, path = tempfile.mkstemp(suffix='.lxt')
+    os.close(handle)
+    try:
+        tree.save(path)
+        loaded = compact.CompactTree.load(path)
+        eq_(equal_nodes(loaded.materialize(0), parser.doc), True)
+        eq_(loaded.view().child[0].items(),
+            [('caf\xc3\xa9', '\xc3\xa9t\xc3\xa9')])
+        eq_(type(loaded.view().child[0].name), type(parser.doc[0].name))
+        loaded.close()
+    finally:
+        os.remove(path)
+    data = compact.struct.pack('>3i', 7, -1, 9)
+    items = compact.MappedArray(data, 0, 'i', 3, '>')
+    eq_([items[0], items[1], items[-1], len(items)], [7, -1, 9, 3])
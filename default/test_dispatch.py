@@ -0,0 +1,43 @@
+"""XML: DEFAULT parser DISPATCH test
+
+Testing suite to check that the dispatch node parser produces the same
+documents and messages as trying the node parsers in order.
+
+"""
+
+from nose.tools import eq_
+from lexor.command.lang import get_style_module
+from lexor.command.test import parse_msg, equal_nodes
+from lexor.core.parser import Parser
+
+ORDERED = [
+    'ElementNP',
+    'CDataNP',
+    'DocumentTypeNP',
+    'CommentNP',
+    'ProcessingInstructionNP',
+    'EntityNP',
+]
+
+
+def _parse(text, ordered):
+    """Parse `text` and return the document and the message codes. """
+    parser = Parser('xml', 'default')
+    parser.load_node_parsers()
+    if ordered:
+        parser._np['__default__'] = [parser[name] for name in ORDERED]
+    parser.parse(text)
+    codes = [(msg['code'], msg['position']) for msg in parser.log.child]
+    return parser.doc, codes
+
+
+def test_dispatch():
+    """xml.parser.default.dispatch: same result as ordered parsers """
+    mod = get_style_module('parser', 'xml', 'default')
+    for aux in mod.MOD.values():
+        for explanation in getattr(aux, 'MSG_EXPLANATION', []):
+            for _, text in parse_msg(explanation)[1]:
+                doc, codes = _parse(text, False)
+                expected_doc, expected_codes = _parse(text, True)
+                eq_(codes, expected_codes, text)
+                eq_(equal_nodes(doc, expected_doc), True, text)
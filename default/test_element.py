@@ -4,11 +4,111 @@ Testing suite to parse xml element in the default style.
 
 """
 
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from lexor.command.lang import get_style_module
 from lexor.command.test import nose_msg_explanations
 
+MOD = get_style_module('parser', 'xml', 'default').MOD
+
 
 def test_element():
     """xml.parser.default.element: MSG_EXPLANATION """
     nose_msg_explanations(
-        'xml', 'parser', 'default', 'element'
+        'xml', 'parser', 'default', 'element',
+        parser_opt={'max_depth': '3', 'max_elements': '5'}
     )
+
+
+def test_names():
+    """xml.parser.default.element: interned names """
+    parser = Parser('xml', 'default')
+    parser.parse('<a x="1"><b x="2"></b><b x="3"/></a>')
+    first, second = parser.doc[0][0], parser.doc[0][1]
+    eq_(first.name is second.name, True)
+    eq_(first.attributes[0] is parser.doc[0].attributes[0], True)
+
+
+def test_attributes():
+    """xml.parser.default.element: well formed attributes """
+    parser = Parser('xml', 'default')
+    parser.parse('<a x="1" y=\'2\'\n z = "3"/><b x="1"   ></b>')
+    eq_(parser.doc[0].items(), [('x', '1'), ('y', '2'), ('z', '3')])
+    eq_(len(parser.doc[0]), 0)
+    eq_(parser.doc[1].items(), [('x', '1')])
+    eq_(len(parser.log), 0)
+
+
+def test_unclosed_tags():
+    """xml.parser.default.element: many `<` without `>` """
+    parser = Parser('xml', 'default')
+    parser.parse('<a <b <c x="1"/>')
+    eq_([node.name for node in parser.doc],
+        ['#entity', '#text', '#entity', '#text', 'c'])
+    eq_(parser.doc[-1]['x'], '1')
+    parser.parse('<a <b </ ')
+    eq_([node.data for node in parser.doc if node.name == '#entity'],
+        ['&lt;', '&lt;', '&lt;'])
+
+
+def test_nesting():
+    """xml.parser.default.element: deep nesting and autoclose """
+    parser = Parser('xml', 'default')
+    depth = 5000
+    parser.parse('%sx%s' % ('<d>' * depth, '</d>' * depth))
+    node = parser.doc
+    for _ in range(depth):
+        eq_(len(node), 1)
+        node = node[0]
+    eq_([child.data for child in node], ['x'])
+    eq_(len(parser.log), 0)
+    parser.parse('<a><b><c></a><b></bb></b>')
+    eq_([(msg['code'], msg['arg'][0]) for msg in parser.log],
+        [('W100', 'c'), ('W100', 'b'), ('E101', '</bb>')])
+    eq_([node.name for node in parser.doc], ['a', 'b'])
+    eq_(len(parser.doc[1]), 0)
+
+
+def test_limits():
+    """xml.parser.default.element: max_depth and max_elements """
+    parser = Parser('xml', 'default', {'max_depth': '3'})
+    parser.parse('<a><b><c><d>x</d></c></b></a>')
+    eq_([msg['code'] for msg in parser.log], ['E160'])
+    eq_(parser.log[0]['position'], [1, 10])
+    eq_(parser.doc[0][0][0].name, 'c')
+    eq_(len(parser.doc[0][0][0]), 0)
+    parser = Parser('xml', 'default', {'max_elements': '2'})
+    parser.parse('<a><b/><c/><d/></a>')
+    eq_([msg['code'] for msg in parser.log], ['E161'])
+    eq_([node.name for node in parser.doc[0]], ['b'])
+    parser = Parser('xml', 'default', {'max_depth': '3'})
+    parser.parse('<a><b><c/></b></a>')
+    eq_(len(parser.log), 0)
+
+
+def test_open_elements():
+    """xml.parser.default.element: stack follows the parser """
+    element = MOD['element']
+    close_node = element.OpenElements.close_node
+    stacks = []
+
+    def check(self):
+        """Compare the stack with the elements in progress. """
+        node = close_node(self)
+        self.sync()
+        # pylint: disable=protected-access
+        stacks.append((list(self.names), [
+            item[0].name for item in self.parser._in_progress
+        ]))
+        return node
+    element.OpenElements.close_node = check
+    try:
+        parser = Parser('xml', 'default', {'max_depth': '4'})
+        for text in ['<a><b><c></a><b></bb></b>', '<a><a><b></a>x</a>',
+                     '<a><b><c><d><e>x</e></d></c></b></a>']:
+            parser.parse(text)
+    finally:
+        element.OpenElements.close_node = close_node
+    eq_(len(stacks) > 10, True)
+    for names, expected in stacks:
+        eq_(names, expected)
@@ -4,6 +4,8 @@ Testing suite to parse xml entity in the default style.
 
 """
 
+from nose.tools import eq_
+from lexor.core.parser import Parser
 from lexor.command.test import nose_msg_explanations
 
 
@@ -12,3 +14,42 @@ def test_entity():
     nose_msg_explanations(
         'xml', 'parser', 'default', 'entity'
     )
+
+
+def test_decode():
+    """xml.parser.default.entity: decode_entities """
+    text = '<a>x &amp; y &#60;&#x3E; &nbsp; &#0; & z</a>'
+    parser = Parser('xml', 'default', {'decode_entities': 'true'})
+    parser.parse(text)
+    eq_([(node.name, node.data) for node in parser.doc[0]], [
+        ('#text', 'x & y <> '),
+        ('#entity', '&nbsp;'),
+        ('#text', ' '),
+        ('#entity', '&#0;'),
+        ('#text', ' & z'),
+    ])
+    eq_([msg['code'] for msg in parser.log.child], ['E100'])
+
+
+def test_decode_bytes():
+    """xml.parser.default.entity: decode_entities in byte strings """
+    parser = Parser('xml', 'default', {'decode_entities': 'true'})
+    for text, data in [
+            ('<a>caf\xc3\xa9 &#60;</a>', 'caf\xc3\xa9 <'),
+            ('<a>&#233; caf\xc3\xa9</a>', '\xc3\xa9 caf\xc3\xa9'),
+            ('<a>&#x263A;&amp;</a>', '\xe2\x98\xba&'),
+            ('<a>x &#60;</a>', 'x <'),
+    ]:
+        parser.parse(text)
+        eq_(parser.doc[0][0].data, data)
+        eq_(type(parser.doc[0][0].data), type(text))
+
+
+def test_markup():
+    """xml.parser.default.entity: entities end before markup """
+    parser = Parser('xml', 'default')
+    parser.parse('&x<c/>&amp;')
+    eq_([(node.name, getattr(node, 'data', None)) for node in parser.doc],
+        [('#entity', '&amp;'), ('#text', 'x'), ('c', None),
+         ('#entity', '&amp;')])
+    eq_([msg['code'] for msg in parser.log.child], ['E100'])
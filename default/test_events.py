@@ -0,0 +1,58 @@
+"""XML: DEFAULT parser EVENTS test
+
+Testing suite to check the events generated by the `EventParser`.
+
+"""
+
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from lexor.command.test import parse_msg
+from lexor.command.lang import get_style_module
+
+MOD = get_style_module('parser', 'xml', 'default').MOD
+
+
+def _codes(log):
+    """Return the codes and positions of the messages in `log`. """
+    return [(msg['code'], list(msg['position'])) for msg in log.child]
+
+
+def test_events():
+    """xml.parser.default.events: events """
+    parser = MOD['events'].EventParser()
+    text = '<a x="1"><!--c-->t&amp;<b/><?p d?><![CDATA[r]]></a>'
+    events = [
+        (event, value.name if event == 'start' else value)
+        for event, value in parser.iterparse(text)
+    ]
+    eq_(events, [
+        ('start', 'a'), ('comment', 'c'), ('text', 't'),
+        ('entity', '&amp;'), ('start', 'b'), ('end', 'b'),
+        ('pi', ('?p', 'd')), ('cdata', 'r'), ('end', 'a'),
+    ])
+
+
+def test_messages():
+    """xml.parser.default.events: same messages as the parser """
+    parser = Parser('xml', 'default')
+    events = MOD['events'].EventParser()
+    for aux in MOD.values():
+        for explanation in getattr(aux, 'MSG_EXPLANATION', []):
+            for _, text in parse_msg(explanation)[1]:
+                parser.parse(text)
+                events.parse(text)
+                eq_(_codes(events.log), _codes(parser.log), text)
+
+
+def test_limits():
+    """xml.parser.default.events: end events when a limit is hit """
+    for defaults in [{'max_depth': '2'}, {'max_elements': '2'}]:
+        parser = MOD['events'].EventParser(defaults)
+        events = [
+            (event, value.name if event == 'start' else value)
+            for event, value in parser.iterparse('<a>x<b>y<c>z')
+        ]
+        eq_(events, [
+            ('start', 'a'), ('text', 'x'), ('start', 'b'), ('text', 'y'),
+            ('end', 'b'), ('end', 'a'),
+        ])
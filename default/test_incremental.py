@@ -0,0 +1,63 @@
+"""XML: DEFAULT parser INCREMENTAL test
+
+Testing suite to check that an incremental parse gives the same
+results as a parse of the whole text.
+
+"""
+
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from lexor.command.lang import get_style_module
+
+MOD = get_style_module('parser', 'xml', 'default').MOD
+TEXT = """<?xml version="1.0"?>
+<!-- one -- two -->
+<a x="1"><b>&amp;</b></a> text <c/>
+<d>
+  <e y=2>e</e>
+</d><f>
+"""
+EDITS = [
+    (TEXT.index('<c/>'), 0, 'more\n'),
+    (TEXT.index('e</e>'), 1, 'ee -- <'),
+    (0, 0, '\n\n'),
+    (3, 10, ''),
+    (len(TEXT) - 1, 1, '</f>'),
+    (TEXT.index('<d>'), 3, '<!-- '),
+    (len(TEXT), 0, '<r\ts=\n/a>!-'),
+]
+
+
+def _result(doc, log):
+    """Return the nodes and messages in a form that may be compared. """
+    nodes = []
+    stack = list(reversed(doc.child))
+    while stack:
+        node = stack.pop()
+        nodes.append((node.name, node.level, list(node.node_position),
+                      getattr(node, 'pos', None),
+                      getattr(node, 'data', None)))
+        if node.child:
+            stack.extend(reversed(node.child))
+    messages = [
+        (msg['code'], list(msg['position']), str(msg['arg']))
+        for msg in log.child
+    ]
+    return nodes, messages
+
+
+def test_incremental():
+    """xml.parser.default.incremental: same as full parse """
+    inc = MOD['incremental'].IncrementalParser(Parser('xml', 'default'))
+    inc.parse(TEXT)
+    text = TEXT
+    full = Parser('xml', 'default')
+    for offset, removed, inserted in EDITS:
+        offset = min(offset, len(text))
+        text = text[:offset] + inserted + text[offset+removed:]
+        inc.edit(offset, removed, inserted)
+        eq_(inc.text, text)
+        full.parse(text)
+        eq_(_result(inc.doc, inc.log), _result(full.doc, full.log))
+        eq_([node.index for node in inc.doc.child],
+            list(range(len(inc.doc))))
@@ -0,0 +1,44 @@
+"""XML: DEFAULT parser MAPPED test
+
+Testing suite to check that parsing a memory-mapped file gives the
+same document and messages as parsing its contents.
+
+"""
+
+import os
+import tempfile
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from lexor.command.lang import get_style_module
+
+MOD = get_style_module('parser', 'xml', 'default').MOD
+TEXT = """<?xml version="1.0"?>
+<!DOCTYPE doc>
+<doc a="1" b=2>
+  <!-- a -- b --> <![CDATA[ x < y ]]> &amp; & <e/>
+  <f att1 att1="3">text</g></f>
+</doc>
+"""
+
+
+def _parse(text):
+    """Return the document and the codes of the messages. """
+    parser = Parser('xml', 'default')
+    parser.parse(text, 'mapped.xml')
+    codes = [(msg['code'], list(msg['position']))
+             for msg in parser.log.child]
+    return str(parser.doc), codes
+
+
+def test_mapped():
+    """xml.parser.default.mapped: parse a mapped file """
+    handle, path = tempfile.mkstemp(suffix='.xml')
+    try:
+        os.write(handle, TEXT)
+        os.close(handle)
+        text = MOD['mapped'].open_mapped(path)
+        eq_(text.count('\n'), TEXT.count('\n'))
+        eq_(_parse(text), _parse(TEXT))
+        text.close()
+    finally:
+        os.remove(path)
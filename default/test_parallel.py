@@ -0,0 +1,72 @@
+"""XML: DEFAULT parser PARALLEL test
+
+Testing suite to check that parsing the children of the root element
+in several processes gives the same result as a serial parse.
+
+"""
+
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from lexor.command.lang import get_style_module, load_aux
+
+MOD = get_style_module('parser', 'xml', 'default').MOD
+RECORD = """  <record id="%d" flag>
+    <name>record &amp; %d</name><!-- note -- %d -->
+    <data><![CDATA[<raw>]]></data> a < b </stray>
+  </record>
+"""
+TEXT = '<?xml version="1.0"?>\n<records>\n%s</records>\n<!-- end -->' % (
+    ''.join([RECORD % (i, i, i) for i in range(20)])
+)
+
+
+def _positions(node):
+    """Return the positions of the elements in `node`. """
+    positions = []
+    stack = [node]
+    while stack:
+        crt = stack.pop()
+        positions.append(getattr(crt, 'pos', None))
+        stack.extend(crt.child or [])
+    return positions
+
+
+def _result(parser):
+    """Return the document, the element positions and the codes of
+    the messages. """
+    codes = [(msg['code'], list(msg['position']))
+             for msg in parser.log.child]
+    return str(parser.doc), _positions(parser.doc), codes
+
+
+def test_parallel():
+    """xml.parser.default.parallel: same result as serial """
+    parser = Parser('xml', 'default')
+    parser.parse(TEXT)
+    expected = _result(parser)
+    MOD['parallel'].parse(parser, TEXT, processes=2, size=100)
+    eq_(_result(parser), expected)
+
+
+def test_split():
+    """xml.parser.default.parallel: unsafe cuts """
+    split = MOD['parallel'].split
+    markup_end = MOD['scan'].markup_end
+    eq_(split('<a><b></a>', 1, markup_end), None)
+    eq_(split('<a><b></b>', 1, markup_end), None)
+    eq_(split('<a><b/>x<c></c></a>', 1, markup_end),
+        ('a', 3, [7, 15], 15, 19))
+
+
+def test_worker():
+    """xml.parser.default.parallel: worker after the style reloads """
+    parallel = MOD['parallel']
+    parallel.init_worker({})
+    load_aux(get_style_module('parser', 'xml', 'default').INFO)
+    records, messages = parallel.parse_piece(
+        ('<a>x</b>', (2, 3), 'piece', {})
+    )
+    eq_([record[:3] for record in records],
+        [(0, 'Element', 'a'), (1, 'Text', 'x')])
+    eq_([(msg[1], list(msg[2])) for msg in messages],
+        [('E101', [2, 7]), ('E100', [0, 0])])
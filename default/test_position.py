@@ -0,0 +1,52 @@
+"""XML: DEFAULT parser POSITION test
+
+Testing suite to check the positions computed by the line index.
+
+"""
+
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from lexor.command.test import equal_nodes
+
+
+def _positions(text, defaults=None):
+    """Return the codes and positions of the messages. """
+    parser = Parser('xml', 'default', defaults)
+    parser.parse(text)
+    return [
+        (msg['code'], list(msg['position'])) for msg in parser.log.child
+    ]
+
+
+def test_compute():
+    """xml.parser.default.position: compute """
+    parser = Parser('xml', 'default')
+    text = 'ab\ncd\n\nef'
+    parser.parse(text)
+    for index in range(len(text)):
+        eq_(parser.line_index.compute(index), [
+            text.count('\n', 0, index) + 1,
+            index - text.rfind('\n', 0, index)
+        ])
+
+
+def test_deferred():
+    """xml.parser.default.position: deferred messages """
+    text = '<a b=1\n c="2" c="3"><b>\n<!-- x -- y -- z -->&</a>&<c>'
+    eq_(
+        _positions(text, {'defer_positions': 'true'}),
+        _positions(text)
+    )
+
+
+def test_quiet():
+    """xml.parser.default.position: diagnostics off """
+    text = '<a b=1\n c="2" c="3"><b>\n<!x -- y -->& < </c></a>'
+    parser = Parser('xml', 'default')
+    parser.parse(text)
+    quiet = Parser('xml', 'default', {'diagnostics': 'off'})
+    quiet.parse(text)
+    eq_(len(parser.log) > 0, True)
+    eq_(len(quiet.log), 0)
+    eq_(equal_nodes(parser.doc, quiet.doc), True)
+    eq_(quiet.doc[0].items(), parser.doc[0].items())
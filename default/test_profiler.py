@@ -0,0 +1,58 @@
+"""XML: DEFAULT parser PROFILER test
+
+Testing suite to check the statistics collected by the profiler.
+
+"""
+
+from nose.tools import eq_
+from lexor.core.parser import Parser
+
+TEXT = '<a x="1"><b/>x &amp; y &z <!-- c -- d --></a>'
+
+
+def test_profile():
+    """xml.parser.default.profiler: report """
+    parser = Parser('xml', 'default', {'profile': 'true'})
+    parser.parse(TEXT)
+    report = parser.profile.report()
+    eq_(report['ElementNP']['accepted'], 2)
+    eq_(report['EntityNP']['accepted'], 2)
+    eq_(report['EntityNP']['messages'], {'E100': 1})
+    eq_(report['CommentNP']['messages'], {'E301': 1})
+    eq_(report['CommentNP']['bytes'], len('<!-- c -- d -->'))
+    total = sum([stats['accepted'] for stats in report.values()
+                 if 'accepted' in stats])
+    eq_(total, 5)
+
+
+def test_disabled():
+    """xml.parser.default.profiler: restored node parsers """
+    parser = Parser('xml', 'default', {'profile': 'true'})
+    parser.parse(TEXT)
+    eq_('make_node' in parser['ElementNP'].__dict__, False)
+    parser = Parser('xml', 'default')
+    parser.parse(TEXT)
+    eq_(parser.profile, None)
+
+
+class Broken(str):
+    """Text whose searches raise an exception. """
+
+    def find(self, *args):
+        raise ValueError('broken text')
+
+
+def test_failed_parse():
+    """xml.parser.default.profiler: restored after a failed parse """
+    parser = Parser('xml', 'default', {
+        'profile': 'true', 'diagnostics': 'false',
+    })
+    try:
+        parser.parse(Broken(TEXT))
+    except ValueError:
+        pass
+    parser.defaults['profile'] = 'false'
+    parser.parse(TEXT)
+    eq_('make_node' in parser['ElementNP'].__dict__, False)
+    eq_('msg' in parser.__dict__, False)
+    eq_('_close_node' in parser.__dict__, False)
@@ -0,0 +1,114 @@
+"""XML: DEFAULT parser SCAN test
+
+Testing suite to check the searches for the delimiters.
+
+"""
+
+from nose.tools import eq_
+from nose.plugins.skip import SkipTest
+from lexor.core.parser import Parser
+from lexor.command.lang import get_style_module
+from lexor.command.test import equal_nodes
+
+MOD = get_style_module('parser', 'xml', 'default').MOD
+TEXT = """<?xml version="1.0"?><!DOCTYPE x>
+<a x='1' y="2>"><![CDATA[ ]] > ]]><!-- - -- --->
+<b <c>?> </d> --> &amp; &x<e/></a><!x><?pi"""
+SUBS = ['>', '<', ']]>', '--', '?>', '"']
+
+
+class Text(object):
+    """Stands in for a parser. """
+
+    def __init__(self, text):
+        self.text = text
+
+
+def _check(delimiters):
+    """Compare the results of `delimiters` with `str.find`. """
+    for sub in SUBS:
+        for start in range(len(TEXT) + 1):
+            eq_(delimiters.find(sub, start), TEXT.find(sub, start))
+            eq_(delimiters.find(sub, start, start + 5),
+                TEXT.find(sub, start, start + 5))
+
+
+def test_delimiters():
+    """xml.parser.default.scan: Delimiters """
+    _check(MOD['scan'].Delimiters(Text(TEXT)))
+
+
+def test_array_delimiters():
+    """xml.parser.default.scan: ArrayDelimiters """
+    if not MOD['scan'].load_numpy():
+        raise SkipTest('numpy is not available')
+    _check(MOD['scan'].ArrayDelimiters(Text(TEXT)))
+    parser = Parser('xml', 'default')
+    parser.parse(TEXT)
+    vectorized = Parser('xml', 'default', {'numpy_scan': 'true'})
+    vectorized.parse(TEXT)
+    eq_(equal_nodes(parser.doc, vectorized.doc), True)
+    eq_([(msg['code'], msg['position']) for msg in parser.log.child],
+        [(msg['code'], msg['position']) for msg in vectorized.log.child])
+
+
+def test_finder():
+    """xml.parser.default.scan: Finder on a growing text """
+    finder = MOD['scan'].Finder()
+    for size in range(0, len(TEXT) + 7, 7):
+        finder.text = TEXT[:size]
+        for sub in SUBS:
+            for start in range(0, size + 1, 3):
+                eq_(finder.find(sub, start), TEXT[:size].find(sub, start))
+    finder.shift(40)
+    for sub in SUBS:
+        for start in range(len(TEXT) - 40):
+            eq_(finder.find(sub, start), TEXT[40:].find(sub, start))
+
+
+def test_scanner_chunks():
+    """xml.parser.default.scan: Scanner fed in chunks """
+    text = '<r>%s</r>\n<a x="<">\n' % ('<b>&lt; </b><!-- - -->' * 20)
+    boundaries = []
+    for size in [1, 5, 64, len(text)]:
+        scanner = MOD['scan'].Scanner()
+        pieces = []
+        for index in range(0, len(text), size):
+            scanner.append(text[index:index+size])
+            end = scanner.next_boundary()
+            while end != -1:
+                pieces.append(scanner.take(end))
+                end = scanner.next_boundary()
+        pieces.append(scanner.take(len(scanner)))
+        eq_(''.join(pieces), text)
+        boundaries.append([len(piece) for piece in pieces])
+    eq_(boundaries, [boundaries[0]] * 4)
+    eq_(boundaries[0][0], text.index('\n'))
+
+
+def test_empty_tags():
+    """xml.parser.default.scan: empty tags as the parser sees them """
+    parser = Parser('xml', 'default')
+    for tag in ['<t/>', '<t x="1"/>', '<t x/>', '<t x=1/>', '<t x="/">',
+                '<t x=/>', '<t x= />', '<t\ts=\n/a>', '<t x="1/>',
+                '<t x = \'y\' / >', '<t x=a/b>']:
+        parser.parse(tag + 'z')
+        empty = len(parser.doc[0].child) == 0
+        eq_((tag, MOD['scan'].markup_end(tag, 0)[0]),
+            (tag, 'empty' if empty else 'start'))
+
+
+def test_scanner_pending():
+    """xml.parser.default.scan: Scanner waiting for a delimiter """
+    scanner = MOD['scan'].Scanner()
+    scanner.append('<a/><!-- ')
+    eq_(scanner.next_boundary(), 4)
+    eq_(scanner.take(4), '<a/>')
+    for _ in range(100):
+        scanner.append('x -')
+        eq_(scanner.next_boundary(), -1)
+    eq_(len(scanner.text) < 20, True)
+    eq_(len(scanner), 305)
+    scanner.append('->')
+    eq_(scanner.next_boundary(), 307)
+    eq_(scanner.take(307), '<!-- ' + 'x -' * 100 + '->')
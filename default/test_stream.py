@@ -0,0 +1,38 @@
+"""XML: DEFAULT parser STREAM test
+
+Testing suite to check that parsing a document in chunks gives the
+same nodes and messages as parsing it at once.
+
+"""
+
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from lexor.command.lang import get_style_module
+
+TEXT = """<?xml version="1.0"?>
+<!DOCTYPE doc>
+<!-- a comment -- with a warning -->
+<a x="1" y=2>text &amp; <b/> <![CDATA[ <raw> ]]></a>
+stray </c> text & more
+<d><e>unclosed
+"""
+
+
+def _messages(log):
+    """Return the codes and positions of the messages in `log`. """
+    return [(msg['code'], list(msg['position'])) for msg in log.child]
+
+
+def test_stream():
+    """xml.parser.default.stream: chunked parse """
+    parser = Parser('xml', 'default')
+    parser.parse(TEXT)
+    expected = [str(node) for node in parser.doc.child]
+    expected_log = _messages(parser.log)
+    mod = get_style_module('parser', 'xml', 'default')
+    for size in [1, 2, 3, 7, 64]:
+        chunks = [TEXT[i:i+size] for i in range(0, len(TEXT), size)]
+        stream = mod.MOD['stream'].StreamParser(Parser('xml', 'default'))
+        nodes = [str(node) for node in stream.iterparse(chunks)]
+        eq_(''.join(nodes), ''.join(expected))
+        eq_(_messages(stream.log), expected_log)
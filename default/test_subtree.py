@@ -0,0 +1,112 @@
+"""XML: DEFAULT parser SUBTREE test
+
+Testing suite to check the parsing of selected elements.
+
+"""
+
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from lexor.core.elements import Element
+from lexor.command.lang import get_style_module
+from lexor.command.test import equal_nodes
+
+MOD = get_style_module('parser', 'xml', 'default').MOD
+TEXT = """<catalog>
+  <item id="1"><name>a</name><price>1.5</price></item>
+  <!-- <item><price>0</price></item> -->
+  <item id="2"><price cur="usd">2</price>
+    <![CDATA[<price>3</price>]]></item>
+  <price>4</price>
+  <box><item><price/></item></box>
+</catalog>
+"""
+
+
+def _select(spec, text=TEXT):
+    """Return the elements of `text` matching `spec` and the log. """
+    parser = Parser('xml', 'default')
+    MOD['subtree'].parse(parser, text, spec)
+    return list(parser.doc), parser.log
+
+
+def _expected(spec, text=TEXT):
+    """Return the elements of the whole document `text` which match
+    `spec`. """
+    parser = Parser('xml', 'default')
+    parser.parse(text)
+    match = MOD['subtree'].Filter(spec)
+    found = []
+    stack = [(node, [node.name]) for node in reversed(parser.doc.child)
+             if isinstance(node, Element)]
+    while stack:
+        node, names = stack.pop()
+        if match(names):
+            found.append(node)
+            continue
+        stack.extend([
+            (child, names + [child.name])
+            for child in reversed(node.child) if isinstance(child, Element)
+        ])
+    return found
+
+
+def _describe(node):
+    """Return the names, attributes and positions of the text nodes
+    of `node` and its descendants. """
+    if not isinstance(node, Element):
+        return node.name, node.data, list(node.node_position)
+    return node.name, node.items(), [_describe(child) for child in node]
+
+
+def _check(spec, text=TEXT):
+    """Compare the elements selected by `spec` with the ones of the
+    whole document. """
+    selected, _ = _select(spec, text)
+    expected = _expected(spec, text)
+    eq_([_describe(node) for node in selected],
+        [_describe(node) for node in expected])
+    for node, other in zip(selected, expected):
+        eq_(equal_nodes(node, other), True)
+    return selected
+
+
+def test_filter():
+    """xml.parser.default.subtree: filter """
+    match = MOD['subtree'].Filter('item/price, /a/*/c')
+    eq_(match(['x', 'item', 'price']), True)
+    eq_(match(['item', 'x', 'price']), False)
+    eq_(match(['a', 'b', 'c']), True)
+    eq_(match(['x', 'a', 'b', 'c']), False)
+
+
+def test_subtree():
+    """xml.parser.default.subtree: selected elements """
+    prices = _check('item/price')
+    eq_(len(prices), 3)
+    eq_(prices[1].items(), [('cur', 'usd')])
+    eq_(len(_check('/catalog/price')), 1)
+    eq_(len(_check('price')), 4)
+    eq_(len(_check('/catalog/item, box')), 3)
+
+
+def test_positions():
+    """xml.parser.default.subtree: same positions """
+    selected = _check('/catalog/item')
+    eq_(len(selected), 2)
+    eq_(len(_select('/catalog/item')[1]), 0)
+
+
+def test_skip():
+    """xml.parser.default.subtree: skipped subtrees """
+    text = """<catalog>
+  <skip><skip/><!-- </skip> --><?p </skip>?><skip>a</skip>
+    <![CDATA[</skip><item>]]><other><item>b</item></other></skip>
+  <item>c</item><skipped><item>d</item></skipped>
+</catalog>
+"""
+    match = MOD['subtree'].Filter('/catalog/item')
+    eq_(match.descend(['catalog']), True)
+    eq_(match.descend(['catalog', 'skip']), False)
+    eq_(MOD['subtree'].Filter('/a/*/c, b').descend(['x', 'y']), True)
+    selected = _check('/catalog/item', text)
+    eq_([node[0].data for node in selected], ['c'])